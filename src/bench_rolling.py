@@ -0,0 +1,136 @@
+"""
+Benchmark of the rolling median on synthetic transactions (see venmo_generator.py)
+
+For each number of events, in a fresh process:
+1. generate the lines (chunk by chunk, not timed)
+2. parse them and feed them into the rolling graph (timed)
+3. report events/sec, p50/p99 latency per event and peak RSS
+
+Results can be saved as JSON, and compared with a previous run to catch regressions.
+
+Usage:
+python src/bench_rolling.py --events 10000,100000,1000000 --save bench.json
+python src/bench_rolling.py --events 10000,100000,1000000 --compare bench.json
+"""
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import multiprocessing
+from array import array
+from itertools import islice
+
+import venmo_generator
+from rolling_graph import RollingGraph
+from trans_parser import parse_line, MalformedLine
+
+CHUNK = 10000                   # lines generated at a time
+SAMPLES = 200000                # at most this many per-event latencies are kept
+
+def run(events, generator_options):
+    """
+    Return: dictionary of results of one benchmark
+    """
+    lines = venmo_generator.generate(events, **generator_options)
+    engine = RollingGraph()
+    stride = max(1, events // SAMPLES)
+    latency = array('d')
+    clock = time.time
+    malformed = 0
+    elapsed = 0.0
+    count = 0
+
+    while True:
+        chunk = list(islice(lines, CHUNK))
+        if not chunk:
+            break
+        start = clock()
+        for line in chunk:
+            if count % stride:
+                try:
+                    engine.update(*parse_line(line))
+                except MalformedLine:
+                    malformed += 1
+            else:                               # sampled event
+                begin = clock()
+                try:
+                    engine.update(*parse_line(line))
+                except MalformedLine:
+                    malformed += 1
+                latency.append(clock() - begin)
+            count += 1
+        elapsed += clock() - start
+
+    latency = sorted(latency)
+    return {
+        'events': events,
+        'seconds': elapsed,
+        'events_per_sec': events / elapsed if elapsed else 0.0,
+        'p50_us': latency[len(latency) // 2] * 1e6 if latency else 0.0,
+        'p99_us': latency[int(len(latency) * 0.99)] * 1e6 if latency else 0.0,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'malformed': malformed,
+        'window_edges': len(engine.window or ()),
+        'graph_nodes': len(engine.graph),
+    }
+
+def compare(results, previous, threshold):
+    """
+    Print the speed of each run relative to a previous one
+
+    Return: True if any run is slower by more than threshold (e.g. 0.1 = 10%)
+    """
+    before = dict((r['events'], r) for r in previous['results'])
+    regression = False
+    for result in results:
+        old = before.get(result['events'])
+        if old is None:
+            continue
+        ratio = result['events_per_sec'] / old['events_per_sec']
+        slower = ratio < 1.0 - threshold
+        regression = regression or slower
+        print '%10d events: %.2fx events/sec, p99 %.1f -> %.1f us%s' % (
+            result['events'], ratio, old['p99_us'], result['p99_us'], '  REGRESSION' if slower else '')
+    return regression
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the rolling median')
+    parser.add_argument('--events', default='10000,100000,1000000',
+                        help='comma separated numbers of events (e.g. 10000,...,10000000)')
+    venmo_generator.add_arguments(parser)
+    parser.add_argument('--save', help='save results as JSON')
+    parser.add_argument('--compare', help='JSON of a previous run')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown (0.1 = 10%%)')
+    args = parser.parse_args()
+
+    generator_options = venmo_generator.options(args)
+    results = []
+    print '%10s %12s %10s %10s %12s' % ('events', 'events/sec', 'p50(us)', 'p99(us)', 'peak RSS(KB)')
+    for events in [int(n) for n in args.events.split(',')]:
+        pool = multiprocessing.Pool(1)          # fresh process => peak RSS of this run only
+        result = pool.apply(run, (events, generator_options))
+        pool.close()
+        pool.join()
+        results.append(result)
+        print '%10d %12.0f %10.1f %10.1f %12d' % (events, result['events_per_sec'], result['p50_us'],
+                                                 result['p99_us'], result['peak_rss_kb'])
+        sys.stdout.flush()
+
+    report = {
+        'date': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'generator': generator_options,
+        'results': results,
+    }
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(results, json.load(f), args.threshold):
+                sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: median_of_medians.median against numpy.median (and sorted) on degree lists
+
+Degree lists look like the ones in the rolling graph:
+powerlaw: most vertices have degree 1 or 2, a few have many edges
+uniform: degrees spread evenly between 1 and 100
+
+Usage:
+python src/bench_select.py [--sizes 10,100,1000,10000,100000] [--repeat 5]
+"""
+import sys
+import time
+import random
+import argparse
+from array import array
+
+import numpy
+import median_of_medians
+
+def degrees(kind, n, seed=0):
+    rnd = random.Random(seed)
+    if kind == 'powerlaw':
+        return [int(rnd.paretovariate(1.5)) for _ in xrange(n)]
+    return [rnd.randint(1, 100) for _ in xrange(n)]
+
+def best_of(repeat, setup, run):
+    """
+    Return: fastest time (in microseconds) of run(setup()), setup is not timed
+    """
+    best = float('inf')
+    for _ in xrange(repeat):
+        data = setup()
+        start = time.time()
+        run(data)
+        best = min(best, time.time() - start)
+    return best * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10,100,1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print '%-9s %8s %12s %12s %12s  %s' % ('degrees', 'n', 'select(us)', 'numpy(us)', 'sorted(us)', 'fastest')
+    for kind in ('powerlaw', 'uniform'):
+        for n in [int(size) for size in args.sizes.split(',')]:
+            L = degrees(kind, n)
+            packed = array('i', L)
+            timing = {
+                'select': best_of(args.repeat, lambda: array('i', packed), median_of_medians.median),
+                'numpy': best_of(args.repeat, lambda: numpy.array(packed), numpy.median),
+                'sorted': best_of(args.repeat, lambda: list(L), sorted),
+            }
+            assert median_of_medians.median(list(L)) == numpy.median(L)
+            print '%-9s %8d %12.1f %12.1f %12.1f  %s' % (kind, n, timing['select'], timing['numpy'],
+                                                       timing['sorted'], min(timing, key=timing.get))
+            sys.stdout.flush()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Checkpoint and resume of the rolling window
+
+A snapshot keeps only what is still in the window, so restoring it costs O(window), not O(history):
+span, start of window, endtime, median, byte offsets of the input and of the output,
+and every live edge (second of its latest transaction, names of both ends).
+The degree histogram is rebuilt from the edges while they're put back.
+
+File layout (one file, replaced in one go):
+header - struct HEADER (magic, version, span, start, endtime, median, input offset, output offset,
+         size of marshaled names, number of edges)
+body   - zlib of: marshal of names, array('l') of seconds, array('l') of both ends (index into names)
+"""
+import os
+import zlib
+import struct
+import marshal
+import signal
+from array import array
+
+from rolling_graph import RollingGraph
+from sliding_window import SlidingWindow
+from graph_store import unpack
+
+MAGIC = 'RMCK'
+VERSION = 1
+HEADER = struct.Struct('<4sHqqqdqqqq')
+
+class LineOffset(object):
+    """
+    Class of an iterator of lines that counts the bytes handed out (the offset in the input)
+
+    A last line without '\n' may still be being written: it's handed out, but not counted,
+    so a resume reads it again (complete, by then).
+
+    partial: called right before such a line is handed out
+    held: whether such a line has been handed out
+    """
+    def __init__(self, lines, offset=0):
+        self.lines = iter(lines)
+        self.offset = offset
+        self.partial = None
+        self.held = False
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        line = next(self.lines)
+        if not line.endswith('\n'):
+            if self.partial is not None:
+                self.partial()
+            self.held = True
+            return line
+        self.offset += len(line)
+        return line
+
+def save(path, engine, input_offset, output_offset):
+    """
+    Write a snapshot of this engine (a RollingGraph) into path
+    """
+    graph = engine.graph
+    index = {}                                  # key = interned id, value = index in names
+    names = []
+    seconds = array('l')
+    ends = array('l')
+    for edge, exp_time in graph.edges.iteritems():
+        seconds.append(exp_time - engine.span)
+        for key in unpack(edge):
+            if key not in index:
+                index[key] = len(names)
+                names.append(graph.name(key))
+            ends.append(index[key])
+
+    window = engine.window
+    start = window.start if window is not None else 0
+    endtime = engine.endtime if engine.endtime is not None else 0
+    names = marshal.dumps(names)
+    body = zlib.compress(names + seconds.tostring() + ends.tostring(), 1)
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, engine.span, start, endtime, engine.median,
+                            input_offset, output_offset, len(names), len(seconds)))
+        f.write(body)
+    os.rename(temp, path)
+
+def load(path):
+    """
+    Restore a snapshot
+
+    Return: (engine, input offset, output offset)
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        body = f.read()
+    if len(header) < HEADER.size or header[:4] != MAGIC:
+        raise ValueError('not a checkpoint: %s' % path)
+    (_, version, span, start, endtime, median,
+     input_offset, output_offset, names_size, num_of_edges) = HEADER.unpack(header)
+    if version != VERSION:
+        raise ValueError('checkpoint version %d (expected %d): %s' % (version, VERSION, path))
+
+    body = zlib.decompress(body)
+    names = marshal.loads(body[:names_size])
+    seconds = array('l')
+    seconds.fromstring(body[names_size:names_size + num_of_edges * seconds.itemsize])
+    ends = array('l')
+    ends.fromstring(body[names_size + num_of_edges * seconds.itemsize:])
+    if len(ends) != 2 * num_of_edges:
+        raise ValueError('truncated checkpoint: %s' % path)
+
+    engine = RollingGraph(span)
+    if num_of_edges:                            # not a fresh engine (the latest edge is never cut)
+        engine.window = SlidingWindow(start)
+        engine.endtime = endtime
+        engine.median = median
+    graph = engine.graph
+    for i, second in enumerate(seconds):
+        edge = graph.edge(names[ends[2*i]], names[ends[2*i+1]])
+        engine.window.add(edge, second)
+        graph.add_edge(edge, second + span)
+    return engine, input_offset, output_offset
+
+def checkpointed(medians, engine, lines, output, path, every=100000):
+    """
+    Pass the medians through, and snapshot the engine every N transactions,
+    on SIGUSR1 (at the next transaction), and at the end.
+
+    A snapshot is taken only once the median of the latest transaction has been written,
+    so the offsets in it always match the output. The last one is taken before an unterminated
+    last line (see LineOffset): the window doesn't have that line yet, and the resume reads it.
+    """
+    requested = []
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: requested.append(signum))
+        signal.siginterrupt(signal.SIGUSR1, False)     # don't break a blocking read
+
+    def snapshot():
+        if lines.held:                          # the window has a line that's not counted
+            return
+        output.flush()
+        try:
+            output_offset = output.tell()
+        except IOError:                         # stdout on a pipe
+            output_offset = 0
+        save(path, engine, lines.offset, output_offset)
+        del requested[:]
+
+    lines.partial = snapshot
+    count = 0
+    for median in medians:
+        yield median
+        count += 1
+        if requested or not count % every:
+            snapshot()
+    snapshot()
@@ -0,0 +1,132 @@
+"""
+Backends of the degree statistics (median, max, percentiles) of the rolling graph
+
+Every backend is told each change of degree (increment/decrement, see DegreeMedian),
+and answers median(), maximum(), percentile(q) and statistic(name):
+
+histogram - DegreeMedian: incremental histogram with a median cursor, O(1) per change (degree_median.py)
+sketch    - DegreeSketch: the same over logarithmic buckets, within relative error alpha (degree_sketch.py)
+select    - degree counts, each statistic recomputed from all degrees with introselect (median_of_medians.py)
+numpy     - degree counts, each statistic recomputed with numpy (imported only if this backend is used)
+
+auto picks the histogram: it's O(1) per change at any window size, small or large
+(the sketch, if a relative error is given). select and numpy are O(n) per change of the median;
+they're kept to cross-check the incremental backends, and for benchmarks.
+
+Only the module of the chosen backend is imported (numpy alone takes longer to import
+than a short replay), so the default path starts with nothing but degree_median.
+"""
+from degree_median import DegreeMedian, percentile_of
+
+BACKENDS = ('auto', 'histogram', 'sketch', 'select', 'numpy')
+
+class RecomputedDegrees(object):
+    """
+    Class of degree counts, whose statistics are recomputed from all degrees
+
+    hist: key = degree, value = number of vertices
+    """
+    def __init__(self):
+        self.hist = {}
+        self.size = 0
+
+    def increment(self, degree):
+        if degree:
+            self._drop(degree)
+        else:
+            self.size += 1
+        self.hist[degree+1] = self.hist.get(degree+1, 0) + 1
+
+    def decrement(self, degree):
+        self._drop(degree)
+        if degree > 1:
+            self.hist[degree-1] = self.hist.get(degree-1, 0) + 1
+        else:
+            self.size -= 1
+
+    def _drop(self, degree):
+        count = self.hist[degree] - 1
+        if count:
+            self.hist[degree] = count
+        else:
+            del self.hist[degree]
+
+    def degrees(self):
+        """
+        Return: list of the degree of every vertex (in no particular order)
+        """
+        degrees = []
+        for degree, count in self.hist.iteritems():
+            degrees.extend([degree] * count)
+        return degrees
+
+    def maximum(self):
+        return float(max(self.hist)) if self.hist else float('nan')
+
+    def statistic(self, name):
+        if name == 'median':
+            return self.median()
+        if name == 'max':
+            return self.maximum()
+        return self.percentile(percentile_of(name))
+
+class SelectDegrees(RecomputedDegrees):
+    """
+    Statistics with introselect, in pure python
+    """
+    def __init__(self):
+        import median_of_medians
+        RecomputedDegrees.__init__(self)
+        self.median_of_medians = median_of_medians
+
+    def median(self):
+        return self.median_of_medians.median(self.degrees())
+
+    def percentile(self, q):
+        if not self.size:
+            return float('nan')
+        degrees = self.degrees()
+        position = q / 100.0 * (self.size - 1)
+        index = int(position)
+        fraction = position - index
+        lower = self.median_of_medians.select(degrees, index)
+        if not fraction:
+            return float(lower)
+        upper = min(degrees[index+1:])          # after select, everything right of index is >= lower
+        return lower * (1 - fraction) + upper * fraction
+
+class NumpyDegrees(RecomputedDegrees):
+    """
+    Statistics with numpy
+    """
+    def __init__(self):
+        import numpy                            # only if this backend is chosen
+        RecomputedDegrees.__init__(self)
+        self.numpy = numpy
+
+    def median(self):
+        if not self.size:
+            return float('nan')
+        return float(self.numpy.median(self.degrees()))
+
+    def percentile(self, q):
+        if not self.size:
+            return float('nan')
+        return float(self.numpy.percentile(self.degrees(), q))
+
+def make_degrees(backend='auto', alpha=None):
+    """
+    Return: a new backend of degree statistics (alpha: relative error of the sketch)
+    """
+    if backend == 'auto':
+        backend = 'histogram' if alpha is None else 'sketch'
+    if backend == 'histogram':
+        return DegreeMedian()
+    if backend == 'sketch':
+        from degree_sketch import DegreeSketch
+        return DegreeSketch(0.01 if alpha is None else alpha)
+    if backend == 'select':
+        return SelectDegrees()
+    if backend == 'numpy':
+        return NumpyDegrees()
+    raise ValueError('unknown backend: %s' % backend)
@@ -0,0 +1,184 @@
+"""
+Rolling median of vertex degrees
+
+Instead of collecting every degree and sorting them after each transaction,
+keep a histogram of degrees (key = degree, value = number of vertices)
+and a cursor pointing at the lower median.
+
+Each edge changes the degree of a vertex by exactly one, so the cursor only
+moves across neighbouring degrees => amortized O(1) per update.
+
+Other order statistics (max, percentiles such as p90/p99) walk the distinct degrees
+of the histogram from the nearest of the median cursor and the maximum degree.
+"""
+import bisect
+
+class DegreeMedian(object):
+    """
+    Class of a degree histogram with a maintained median cursor
+
+    Record:
+    0. histogram of degrees (vertices with degree 0 are not in the graph)
+    1. number of vertices
+    2. cursor: degree of the lower median vertex
+    3. number of vertices whose degree is less than cursor
+    4. maximum degree
+    """
+    def __init__(self):
+        self.hist = {}          # key = degree, value = number of vertices
+        self.size = 0           # number of vertices
+        self.cursor = 0         # degree of the lower median vertex
+        self.below = 0          # number of vertices with degree < cursor
+        self.top = 0            # maximum degree
+
+    def __repr__(self):
+        return 'median %.2f of %d vertices' % (self.median(), self.size)
+
+    def _below(self, degree):
+        # whether a vertex of this degree is counted in self.below
+        return 0 < degree < self.cursor
+
+    def increment(self, degree):
+        """
+        A vertex goes from degree to degree+1 (degree = 0 => new vertex)
+        """
+        if degree:
+            self._drop(degree)
+        else:
+            self.size += 1
+        self.hist[degree+1] = self.hist.get(degree+1, 0) + 1
+        self.below += self._below(degree+1) - self._below(degree)
+        if degree == self.top:
+            self.top += 1
+        self._rebalance()
+
+    def decrement(self, degree):
+        """
+        A vertex goes from degree to degree-1 (degree-1 = 0 => vertex removed)
+        """
+        self._drop(degree)
+        if degree > 1:
+            self.hist[degree-1] = self.hist.get(degree-1, 0) + 1
+        else:
+            self.size -= 1
+        self.below += self._below(degree-1) - self._below(degree)
+        while self.top and self.top not in self.hist:
+            self.top -= 1
+        self._rebalance()
+
+    def _drop(self, degree):
+        count = self.hist[degree] - 1
+        if count:
+            self.hist[degree] = count
+        else:
+            del self.hist[degree]
+
+    def _rebalance(self):
+        """
+        Move the cursor until: below <= (size-1)/2 < below + hist[cursor]
+        """
+        if not self.size:
+            self.cursor = self.below = 0
+            return
+        hist = self.hist
+        rank = (self.size - 1) // 2
+        while self.below > rank:                        # too many on the left...
+            self.cursor -= 1
+            self.below -= hist.get(self.cursor, 0)
+        while self.below + hist.get(self.cursor, 0) <= rank:    # ...or too few
+            self.below += hist.get(self.cursor, 0)
+            self.cursor += 1
+
+    def median(self):
+        """
+        Same value as numpy.median over all degrees
+        """
+        if not self.size:
+            return float('nan')
+        lower = self.cursor
+        if self.size % 2:
+            return float(lower)
+
+        # even number of vertices => average the two middle degrees
+        upper = lower
+        if self.below + self.hist[lower] <= self.size // 2:
+            upper += 1
+            while upper not in self.hist:
+                upper += 1
+        return (lower + upper) / 2.0
+
+    def maximum(self):
+        if not self.size:
+            return float('nan')
+        return float(self.top)
+
+    def rank(self, rank):
+        """
+        Degree of the vertex at this rank (0 = the smallest degree)
+
+        Only the degrees in the histogram are walked (not every integer in between),
+        so a long tail of a few huge degrees costs as much as a short one.
+        """
+        hist = self.hist
+        degrees = sorted(hist)                          # distinct degrees
+        if rank >= self.below and self.size - 1 - rank < rank - self.below:
+            i = len(degrees) - 1                        # closer to the top => walk down from max
+            above = self.size - hist[degrees[i]]        # number of vertices with degree < top
+            while rank < above:
+                i -= 1
+                above -= hist[degrees[i]]
+            return degrees[i]
+
+        i = bisect.bisect_left(degrees, self.cursor)    # walk from the median cursor
+        below = self.below
+        while rank < below:
+            i -= 1
+            below -= hist[degrees[i]]
+        while rank >= below + hist[degrees[i]]:
+            below += hist[degrees[i]]
+            i += 1
+        return degrees[i]
+
+    def percentile(self, q):
+        """
+        q-th percentile of all degrees (linear interpolation), same as numpy.percentile
+        """
+        if not self.size:
+            return float('nan')
+        position = q / 100.0 * (self.size - 1)
+        index = int(position)
+        fraction = position - index
+        lower = self.rank(index)
+        if not fraction:
+            return float(lower)
+        upper = self.rank(index + 1)
+        return lower * (1 - fraction) + upper * fraction
+
+    def statistic(self, name):
+        """
+        name: 'median', 'max', or a percentile such as 'p90', 'p99', 'p99.9'
+        """
+        if name == 'median':
+            return self.median()
+        if name == 'max':
+            return self.maximum()
+        return self.percentile(percentile_of(name))
+
+def percentile_of(name):
+    """
+    Return: q of a percentile name such as 'p90' (ValueError if it's not one)
+    """
+    if not name.startswith('p'):
+        raise ValueError('unknown statistic: %s' % name)
+    q = float(name[1:])
+    if not 0 <= q <= 100:
+        raise ValueError('percentile out of range: %s' % name)
+    return q
+
+def check_statistic(name):
+    """
+    Return: name, if it's a statistic that DegreeMedian knows (ValueError if not)
+    """
+    if name not in ('median', 'max'):
+        percentile_of(name)
+    return name
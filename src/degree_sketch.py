@@ -0,0 +1,203 @@
+"""
+Approximate median of vertex degrees: a quantile sketch with deletions
+
+Degrees are counted in logarithmic buckets (as in DDSketch): a bucket holds the degrees in
+(gamma^(j-1), gamma^j], with gamma = (1+alpha)/(1-alpha). Any statistic read from the buckets
+is within a relative error alpha of the exact one, and the number of buckets only grows with
+log(max degree)/alpha, no matter how many vertices are in the window.
+
+1. small degrees (up to about 1/(2*alpha)) would get a bucket of their own anyway,
+   so they're counted exactly, in consecutive buckets: 1, 2, 3, ...
+2. a vertex moves from one bucket to another only when its degree crosses a bucket boundary,
+   so an edge that expires (deletion) is as cheap as a new one.
+3. two sketches with the same alpha merge by adding their counts.
+
+The median cursor and the walks are the same as DegreeMedian's, over bucket indexes instead of degrees.
+
+Usage (error against the exact path):
+python src/degree_sketch.py --error 0.01 ./venmo_input/venmo-trans.txt
+python src/degree_sketch.py --error 0.05 --events 200000 --users 100000 --rate 2000
+"""
+import os
+import math
+import argparse
+
+from degree_median import DegreeMedian
+
+class DegreeSketch(DegreeMedian):
+    """
+    Class of a degree sketch with a maintained median cursor
+
+    hist: key = bucket index (0 = not in graph), value = number of vertices
+    (cursor, below and top are bucket indexes too, see DegreeMedian)
+    """
+    def __init__(self, alpha=0.01):
+        DegreeMedian.__init__(self)
+        if not 0 < alpha < 1:
+            raise ValueError('relative error out of range: %s' % alpha)
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.exact = max(1, int(1 / (self.gamma - 1)))  # degrees up to this one have their own bucket
+        self.offset = self.exact - int(math.ceil(math.log(self.exact) / self.log_gamma))
+        self.values = {}        # key = bucket index, value = degree it reports (one per bucket in use)
+
+    def __repr__(self):
+        return 'median ~%.2f of %d vertices (alpha %g)' % (self.median(), self.size, self.alpha)
+
+    def bucket(self, degree):
+        """
+        Bucket index of this degree (0 => not in graph)
+
+        Computed, not cached: a cache of every degree ever seen would outgrow the buckets.
+        """
+        if degree <= self.exact:
+            return degree
+        return max(self.exact + 1, self.offset + int(math.ceil(math.log(degree) / self.log_gamma)))
+
+    def value(self, key):
+        """
+        Degree reported for this bucket: its only integer, or the one within alpha of all its degrees
+        """
+        if key <= self.exact:
+            return float(key)
+        value = self.values.get(key)
+        if value is None:
+            high = self.gamma ** (key - self.offset)
+            low = max(high / self.gamma, self.exact)
+            integers = []
+            if high - low < 3:
+                integers = [degree for degree in xrange(int(low), int(high) + 2) if self.bucket(degree) == key]
+            if len(integers) == 1:
+                value = float(integers[0])
+            else:
+                value = max(2 * high / (self.gamma + 1), math.floor(low) + 1)
+            self.values[key] = value
+        return value
+
+    def increment(self, degree):
+        if degree < self.exact:                         # small degrees: same as the exact histogram
+            return DegreeMedian.increment(self, degree)
+        old, new = self.bucket(degree), self.bucket(degree + 1)
+        if old != new:
+            self._move(old, new)
+
+    def decrement(self, degree):
+        if degree <= self.exact:
+            return DegreeMedian.decrement(self, degree)
+        old, new = self.bucket(degree), self.bucket(degree - 1)
+        if old != new:
+            self._move(old, new)
+
+    def _move(self, old, new):
+        """
+        A vertex goes from bucket old to bucket new (0 => not in graph)
+        """
+        if old:
+            self._drop(old)
+        else:
+            self.size += 1
+        if new:
+            self.hist[new] = self.hist.get(new, 0) + 1
+        else:
+            self.size -= 1
+        self.below += self._below(new) - self._below(old)
+        if new > self.top:
+            self.top = new
+        while self.top and self.top not in self.hist:
+            self.top -= 1
+        self._rebalance()
+
+    def merge(self, other):
+        """
+        Add the vertices of another sketch (same alpha) into this one
+        """
+        if other.gamma != self.gamma:
+            raise ValueError('sketches of different alpha: %g, %g' % (self.alpha, other.alpha))
+        for key, count in other.hist.iteritems():
+            self.hist[key] = self.hist.get(key, 0) + count
+        self.size += other.size
+        self.top = max(self.top, other.top)
+        self.cursor = self.below = 0
+        self._rebalance()
+
+    def median(self):
+        if not self.size:
+            return float('nan')
+        lower = self.cursor
+        if self.size % 2:
+            return self.value(lower)
+        upper = lower
+        if self.below + self.hist[lower] <= self.size // 2:
+            upper += 1
+            while upper not in self.hist:
+                upper += 1
+        return (self.value(lower) + self.value(upper)) / 2.0
+
+    def maximum(self):
+        if not self.size:
+            return float('nan')
+        return self.value(self.top)
+
+    def percentile(self, q):
+        if not self.size:
+            return float('nan')
+        position = q / 100.0 * (self.size - 1)
+        index = int(position)
+        fraction = position - index
+        lower = self.value(self.rank(index))
+        if not fraction:
+            return lower
+        upper = self.value(self.rank(index + 1))
+        return lower * (1 - fraction) + upper * fraction
+
+def compare(transactions, alpha, statistics=('median', 'p90', 'p99', 'max')):
+    """
+    Feed the transactions into an exact and an approximate rolling graph
+
+    Return: dictionary of max/mean relative error of each statistic, and sizes of both histograms
+    """
+    from rolling_graph import RollingGraph
+
+    exact = RollingGraph()
+    approximate = RollingGraph(alpha=alpha)
+    worst = dict((name, 0.0) for name in statistics)
+    total = dict((name, 0.0) for name in statistics)
+    count = 0
+    for transac_time, poi_a, poi_b in transactions:
+        exact.update(transac_time, poi_a, poi_b)
+        approximate.update(transac_time, poi_a, poi_b)
+        count += 1
+        for name in statistics:
+            truth = exact.statistic(name)
+            error = abs(approximate.statistic(name) - truth) / truth if truth else 0.0
+            worst[name] = max(worst[name], error)
+            total[name] += error
+    result = {'transactions': count, 'error': alpha,
+              'exact_buckets': len(exact.degrees.hist), 'sketch_buckets': len(approximate.degrees.hist)}
+    for name in statistics:
+        result[name + '_max_error'] = worst[name]
+        result[name + '_mean_error'] = total[name] / count if count else 0.0
+    return result
+
+def main():
+    import venmo_generator
+    from rolling_median_YJL import read_lines, parse_transactions
+
+    parser = argparse.ArgumentParser(description='Error of the approximate median against the exact one')
+    parser.add_argument('input', nargs='?', help='txt file (default: synthetic transactions)')
+    parser.add_argument('--error', type=float, default=0.01, help='relative error of the sketch (alpha)')
+    parser.add_argument('--events', type=int, default=100000, help='synthetic transactions (without input)')
+    venmo_generator.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.input:
+        lines = read_lines(args.input)
+    else:
+        lines = venmo_generator.generate(args.events, **venmo_generator.options(args))
+    result = compare(parse_transactions(lines, open(os.devnull, 'w')), args.error)
+    for name in sorted(result):
+        print '%-20s %s' % (name, result[name])
+
+if __name__ == '__main__':
+    main()
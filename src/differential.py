@@ -0,0 +1,415 @@
+"""
+Differential test of the rolling median: every engine against a frozen reference
+
+The reference keeps the rules of the original rolling_med, written as plainly as possible
+(a dictionary of edges, every degree sorted after each transaction), and is not to be optimized:
+1. the first transaction defines the window: endtime = its time + span
+2. a transaction older than endtime - span is expired (it doesn't change the graph)
+3. a repeated pair only refreshes its edge if it's later than the existing one
+4. a later transaction moves endtime, and the edges older than endtime - span are cut
+   (a user without edges leaves the graph)
+
+Each engine (backends of degrees, several windows, checkpoint/restore, partitioned replay,
+and the ingest paths of rolling_median_YJL.py: --batch, --pipelined, --lateness, --since) is fed the same random streams (see venmo_generator.py, with few users, many repeated pairs,
+late transactions right at the edge of the window, or a few users with huge degrees),
+and must give the same medians. The several windows (span and 3 x span) are each checked
+against their own reference, and so are their p90, p99 and max (against numpy.percentile).
+--lateness is given at least the lateness of the stream (nothing is dropped), so its medians
+are those of the reference over the stream sorted by time; --since replays from a random time
+with a dense index (late lines at its entries), so its medians are the tail of the reference's.
+A failing stream is shrunk (chunks of transactions removed while it still fails) to a minimal input.
+The throughput of each engine is recorded too.
+
+Usage:
+python src/differential.py --events 1000,10000,100000 --trials 5
+python src/differential.py --engines histogram,numpy --events 100000 --save differential.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from itertools import izip_longest
+from cStringIO import StringIO
+
+import venmo_generator
+from trans_parser import parse_line, MalformedLine
+from degree_median import percentile_of
+
+ENGINES = ('histogram', 'select', 'numpy', 'multi_window', 'checkpoint', 'partitioned',
+           'batch', 'pipelined', 'lateness', 'since')
+OWN_EXPECTED = ('multi_window', 'lateness', 'since')     # not the plain medians of the reference
+DRIVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rolling_median_YJL.py')
+CHECKPOINT_EVERY = 97           # transactions between two checkpoint/restore rounds
+PARTITIONS = 4
+STATISTICS = ('median', 'p90', 'p99', 'max')            # of each window of multi_window
+
+class Reference(object):
+    """
+    Class of the frozen reference
+
+    edges: key = (poi_a, poi_b), value = time of its latest transaction
+    degrees: key = user, value = number of edges
+    """
+    def __init__(self, span=60):
+        self.span = span
+        self.edges = {}
+        self.degrees = {}
+        self.endtime = None
+        self.median = 0
+
+    def update(self, transac_time, poi_a, poi_b):
+        if self.endtime is None:
+            self.endtime = transac_time + self.span
+        if transac_time < self.endtime - self.span:     # expired
+            return self.median
+
+        edge = (poi_a, poi_b)
+        if edge not in self.edges:
+            self.edges[edge] = transac_time
+            self._add(poi_a, 1)
+            self._add(poi_b, 1)
+        elif transac_time > self.edges[edge]:
+            self.edges[edge] = transac_time
+
+        if transac_time > self.endtime:
+            self.endtime = transac_time
+            for edge, seconds in self.edges.items():
+                if seconds < self.endtime - self.span:
+                    del self.edges[edge]
+                    self._add(edge[0], -1)
+                    self._add(edge[1], -1)
+
+        degrees = sorted(self.degrees.itervalues())
+        n = len(degrees)
+        if n % 2:
+            self.median = float(degrees[n // 2])
+        else:
+            self.median = (degrees[n // 2 - 1] + degrees[n // 2]) / 2.0
+        return self.median
+
+    def _add(self, name, delta):
+        degree = self.degrees.get(name, 0) + delta
+        if degree:
+            self.degrees[name] = degree
+        else:
+            del self.degrees[name]
+
+def reference(transactions, span):
+    engine = Reference(span)
+    return [engine.update(*transaction) for transaction in transactions]
+
+def windows(span):
+    return (span, 3 * span)
+
+def reference_rows(transactions, spans, statistics=STATISTICS):
+    """
+    Return: list of rows of statistics (one row per window, see MultiWindowGraph), one per transaction
+
+    Percentiles and max are those of numpy over the degrees of each reference.
+    """
+    import numpy
+
+    engines = [Reference(span) for span in spans]
+    percentiles = [percentile_of(name) for name in statistics if name not in ('median', 'max')]
+    result = []
+    for transaction in transactions:
+        rows = []
+        for engine in engines:
+            median = engine.update(*transaction)
+            degrees = numpy.fromiter(engine.degrees.itervalues(), dtype=float)
+            values = iter(numpy.percentile(degrees, percentiles) if percentiles else ())
+            rows.append(tuple(median if name == 'median' else float(degrees.max()) if name == 'max'
+                              else float(next(values)) for name in statistics))
+        result.append(rows)
+    return result
+
+def expected_output(name, transactions, span):
+    """
+    Return: what this engine should give for these transactions, according to the reference
+    """
+    if name == 'multi_window':
+        return reference_rows(transactions, windows(span))
+    if name == 'lateness':
+        return reference(sorted(transactions, key=lambda transaction: transaction[0]), span)
+    if name == 'since':
+        since = since_options(transactions, span)[0]
+        first = next(i for i, transaction in enumerate(transactions) if transaction[0] >= since)
+        return reference(transactions, span)[first:]
+    return reference(transactions, span)
+
+def same(value, truth):
+    """
+    Whether a median (or a row, or rows of statistics) is the same as the reference's
+
+    (percentiles are interpolated, so they may differ from numpy's in the last bits)
+    """
+    if isinstance(truth, (tuple, list)):
+        return (isinstance(value, (tuple, list)) and len(value) == len(truth)
+                and all(same(v, t) for v, t in zip(value, truth)))
+    return isinstance(value, (int, float)) and abs(value - truth) <= 1e-9 * max(1.0, abs(truth))
+
+def run_engine(name, transactions, span):
+    """
+    Return: list of medians of this engine (rows of statistics for multi_window), one per transaction
+    """
+    if name == 'multi_window':
+        from multi_window import MultiWindowGraph
+        engine = MultiWindowGraph(windows(span), STATISTICS)
+        return [engine.update(*transaction) for transaction in transactions]
+    if name == 'checkpoint':
+        return run_checkpoint(transactions, span)
+    if name == 'partitioned':
+        return run_partitioned(transactions, span)
+    if name in ('batch', 'pipelined'):
+        return run_driver(transactions, span, ['--' + name])
+    if name == 'lateness':
+        return run_driver(transactions, span, ['--lateness', str(lateness_of(transactions))])
+    if name == 'since':
+        return run_driver(transactions, span, since_options(transactions, span)[1])
+
+    from rolling_graph import RollingGraph
+    engine = RollingGraph(span, backend=name)
+    return [engine.update(*transaction) for transaction in transactions]
+
+def run_checkpoint(transactions, span):
+    """
+    Snapshot the window and restore it from the file every CHECKPOINT_EVERY transactions
+    """
+    from rolling_graph import RollingGraph
+    from checkpoint import save, load
+
+    handle, path = tempfile.mkstemp(prefix='differential-', suffix='.ck')
+    os.close(handle)
+    try:
+        engine = RollingGraph(span)
+        medians = []
+        for i, transaction in enumerate(transactions):
+            medians.append(engine.update(*transaction))
+            if i % CHECKPOINT_EVERY == CHECKPOINT_EVERY - 1:
+                save(path, engine, 0, 0)
+                engine = load(path)[0]
+        return medians
+    finally:
+        os.remove(path)
+
+def run_partitioned(transactions, span):
+    """
+    Replay the transactions as a file, in PARTITIONS partitions warmed up long enough for their lateness
+    """
+    from partitioned import partitioned_replay
+
+    path = write_stream(transactions)
+    try:
+        output = StringIO()
+        partitioned_replay(path, output, open(os.devnull, 'w'), PARTITIONS, 1, span,
+                           warmup=span + lateness_of(transactions) + 1,
+                           index_every=max(1, len(transactions) // 16))
+        return [float(line) for line in output.getvalue().split()]
+    finally:
+        remove_stream(path)
+
+def run_driver(transactions, span, options):
+    """
+    Replay the transactions as a file with rolling_median_YJL.py and these options (medians on stdout)
+    """
+    path = write_stream(transactions)
+    try:
+        with open(os.devnull, 'w') as devnull:
+            output = subprocess.check_output([sys.executable, DRIVER, '--windows', str(span)] + options
+                                             + [path, '-'], stderr=devnull)
+        return [float(line) for line in output.split()]
+    finally:
+        remove_stream(path)
+
+def since_options(transactions, span):
+    """
+    Return: (since, options of the driver) to replay from a random time of the stream, with a dense index
+    and a warm-up long enough for its lateness (the same for the same transactions, as they're shrunk)
+    """
+    rnd = random.Random(len(transactions))
+    times = [transac_time for transac_time, _, _ in transactions]
+    since = rnd.randint(min(times), max(times))
+    return since, ['--since', str(since), '--index-every', str(rnd.choice((1, 2, 5, 50))),
+                   '--warmup', str(span + lateness_of(transactions) + 1)]
+
+def lateness_of(transactions):
+    """
+    Return: how much (in seconds) a transaction is older than a transaction before it, at most
+    """
+    lateness = latest = 0
+    for transac_time, _, _ in transactions:
+        latest = max(latest, transac_time)
+        lateness = max(lateness, latest - transac_time)
+    return lateness
+
+def write_stream(transactions):
+    """
+    Return: path of a temporary file with the transactions as lines
+    """
+    handle, path = tempfile.mkstemp(prefix='differential-', suffix='.txt')
+    with os.fdopen(handle, 'w') as lines:
+        for transaction in transactions:
+            lines.write(to_line(transaction))
+    return path
+
+def remove_stream(path):
+    for leftover in (path, path + '.idx'):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+def to_line(transaction):
+    transac_time, poi_a, poi_b = transaction
+    created_time = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(transac_time))
+    return '{"created_time": "%s", "target": "%s", "actor": "%s"}\n' % (created_time, poi_b, poi_a)
+
+def random_stream(events, seed):
+    """
+    Return: (list of transactions, options of the generator) of a random stream
+    """
+    rnd = random.Random(seed)
+    options = dict(users=rnd.choice((2, 5, 20, 200, 1000)),
+                   alpha=rnd.choice((0.5, 1.2, 2.0)),
+                   rate=rnd.choice((0.5, 3.0, 30.0)),
+                   late=rnd.choice((0.0, 0.05, 0.3)),
+                   max_lateness=rnd.choice((59, 60, 61, 90)),      # right at the edge of the window
+                   duplicates=rnd.choice((0.0, 0.3, 0.8)),
+                   seed=seed)
+    if rnd.random() < 0.25:                     # skewed: a few payers with degrees in the thousands
+        options.update(users=5000, alpha=2.0, rate=50.0)
+    transactions = []
+    for line in venmo_generator.generate(events, **options):
+        try:
+            transactions.append(parse_line(line))
+        except MalformedLine:
+            pass
+    return transactions, options
+
+def mismatch(name, transactions, span):
+    """
+    Return: ordinal of the first median that differs from the reference (None if all the same)
+    """
+    expected = expected_output(name, transactions, span)
+    try:
+        medians = run_engine(name, transactions, span)
+    except Exception:
+        return 0
+    for i, (median, truth) in enumerate(zip(medians, expected)):
+        if not same(median, truth):
+            return i
+    if len(medians) != len(expected):
+        return min(len(medians), len(expected))
+    return None
+
+def shrink(transactions, fails):
+    """
+    Smallest list of transactions (chunks removed, as in delta debugging) on which fails() still holds
+    """
+    parts = 2
+    while len(transactions) >= 2:
+        size = -(-len(transactions) // parts)
+        for start in xrange(0, len(transactions), size):
+            candidate = transactions[:start] + transactions[start+size:]
+            if candidate and fails(candidate):
+                transactions = candidate
+                parts = max(parts - 1, 2)
+                break
+        else:
+            if parts >= len(transactions):
+                break
+            parts = min(len(transactions), 2 * parts)
+    return transactions
+
+def report_failure(name, transactions, span):
+    """
+    Print the minimal input, with the medians of the reference and of the engine
+    """
+    fails = lambda candidate: mismatch(name, candidate, span) is not None
+    minimal = shrink(transactions, fails)
+    expected = expected_output(name, minimal, span)
+    try:
+        medians = run_engine(name, minimal, span)
+    except Exception as err:
+        medians = ['%s: %s' % (type(err).__name__, err)] * len(minimal)
+    print '    minimal input (%d of %d transactions), reference vs %s:' % (len(minimal), len(transactions), name)
+    if name == 'lateness':                      # medians in time order
+        minimal = sorted(minimal, key=lambda transaction: transaction[0])
+    shown = minimal[len(minimal) - len(expected):]     # since => the tail
+    for transaction, truth, median in izip_longest(shown, expected, medians, fillvalue='-'):
+        line = to_line(transaction).rstrip() if transaction != '-' else '-'
+        print '    %s  %s  vs  %s' % (line, show(truth), show(median))
+
+def show(value):
+    """
+    A median, a row of statistics (windows separated by |), or an error
+    """
+    if isinstance(value, list):
+        return ' | '.join(show(row) for row in value)
+    if isinstance(value, tuple):
+        return ' '.join(show(v) for v in value)
+    return ('%.2f' % value) if isinstance(value, (int, float)) else str(value)
+
+def main():
+    parser = argparse.ArgumentParser(description='Differential test of the engines against a frozen reference')
+    parser.add_argument('--events', default='1000,10000,100000',
+                        help='comma separated numbers of events per stream')
+    parser.add_argument('--trials', type=int, default=5, help='random streams of each size')
+    parser.add_argument('--engines', default=','.join(ENGINES), help='comma separated, from: %s' % ', '.join(ENGINES))
+    parser.add_argument('--span', type=int, default=60, help='length of the window (in seconds)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help='save throughput and failures as JSON')
+    args = parser.parse_args()
+
+    names = args.engines.split(',')
+    for name in names:
+        if name not in ENGINES:
+            parser.error('unknown engine: %s' % name)
+    seconds = dict((name, 0.0) for name in ['reference'] + names)
+    events = dict((name, 0) for name in ['reference'] + names)
+    failures = []
+
+    seed = args.seed
+    for size in [int(n) for n in args.events.split(',')]:
+        for _ in xrange(args.trials):
+            seed += 1
+            transactions, options = random_stream(size, seed)
+            failed = len(failures)
+            start = time.time()
+            expected = reference(transactions, args.span)
+            seconds['reference'] += time.time() - start
+            events['reference'] += len(transactions)
+            for name in names:
+                start = time.time()
+                try:
+                    medians = run_engine(name, transactions, args.span)
+                except Exception as err:
+                    medians = err
+                seconds[name] += time.time() - start
+                events[name] += len(transactions)
+                truth = expected_output(name, transactions, args.span) if name in OWN_EXPECTED else expected
+                if same(medians, truth):
+                    continue
+                print 'FAIL %s: %d events, generator %s' % (name, size, json.dumps(options, sort_keys=True))
+                failures.append({'engine': name, 'events': size, 'generator': options})
+                report_failure(name, transactions, args.span)
+                sys.stdout.flush()
+            failed = len(failures) - failed
+            print '%7d events (seed %d): %s' % (size, seed, '%d engines FAILED' % failed if failed else 'ok')
+            sys.stdout.flush()
+
+    print '%-14s %12s' % ('engine', 'events/sec')
+    throughput = {}
+    for name in ['reference'] + names:
+        throughput[name] = events[name] / seconds[name] if seconds[name] else 0.0
+        print '%-14s %12.0f' % (name, throughput[name])
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'throughput': throughput, 'failures': failures}, f, indent=2, sort_keys=True)
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
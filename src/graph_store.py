@@ -0,0 +1,225 @@
+"""
+Graph of users in the rolling window
+
+Compact representation:
+1. names are interned into integer ids (first seen => 0, 1, 2, ...);
+   the id of a node that leaves the graph is given to the next new name,
+   so the table of ids never outgrows the window.
+2. nodes have __slots__ (no per-instance __dict__), and are kept in a dictionary (key = id).
+3. one edge table for the whole graph: key = (smaller id, larger id) packed into one integer,
+   value = expiring time. A node only keeps the set of ids of its neighbors.
+4. nodes are also kept in buckets by degree (key = degree, value = set of ids),
+   so the top-K users by degree are found in the K highest buckets, not by sorting the users.
+
+So finding, adding and removing a vertex or an edge is O(1),
+no matter how many users are in the window.
+"""
+import heapq
+from itertools import islice
+
+SHIFT = 32
+MASK = (1 << SHIFT) - 1
+
+def pack(key_a, key_b):
+    """
+    Key of the edge a-b in the edge table (the order of a and b is irrelevant)
+    """
+    if key_b < key_a:
+        key_a, key_b = key_b, key_a
+    return (key_a << SHIFT) | key_b
+
+def unpack(edge):
+    return edge >> SHIFT, edge & MASK
+
+class Node(object):
+    """
+    Class of a Node
+
+    For each node, record its:
+    0. name (interned id of person of interest)
+    1. number of connected edges
+    2. counterparts that connected to (their ids)
+    """
+    __slots__ = ('name', 'neighbors', 'num_of_edges')
+
+    def __init__(self, node):
+        self.name = node
+        self.neighbors = set()  # ids of neighbors (expiring time of each edge: see Graph.edges)
+        self.num_of_edges = 0   # number of connected edges
+
+    def __repr__(self):
+        return '%s, %d' % (self.name, self.num_of_edges)
+
+class Graph(object):
+    """
+    Class of a Graph
+
+    nodes: key = interned id, value = node
+    edges: key = packed pair of ids, value = expiring time
+    degrees: backend of degree statistics to keep informed (optional, see degree_backends.py)
+    buckets: key = degree, value = set of ids of nodes with that degree
+    ids: key = name of node, value = interned id
+    names: key = interned id, value = name of node
+    """
+    def __init__(self, degrees=None):
+        self.nodes = {}
+        self.edges = {}
+        self.degrees = degrees
+        self.buckets = {}
+        self.ids = {}
+        self.names = []
+        self.free = []          # ids of the nodes that left, for the next new names
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return self.nodes.itervalues()
+
+    def __contains__(self, name):
+        return self.ids.get(name) in self.nodes
+
+    def __getitem__(self, name):
+        return self.nodes[self.ids[name]]
+
+    def key(self, name):
+        """
+        Interned id of this name (a new one, if it's not in the graph)
+        """
+        key = self.ids.get(name)
+        if key is None:
+            if self.free:
+                key = self.free.pop()
+                self.names[key] = name
+            else:
+                key = len(self.names)
+                self.names.append(name)
+            self.ids[name] = key
+        return key
+
+    def name(self, key):
+        return self.names[key]
+
+    def edge(self, poi_a, poi_b):
+        """
+        Key of the edge a-b in the edge table
+        """
+        return pack(self.key(poi_a), self.key(poi_b))
+
+    def expiry(self, edge):
+        """
+        Expiring time of the edge
+
+        Return: None if there's no such edge
+        """
+        return self.edges.get(edge)
+
+    def add_edge(self, edge, exp_time):
+        """
+        Construct a new edge (initialize two nodes if necessary)
+        """
+        key_a, key_b = unpack(edge)
+        node_a = self.nodes.get(key_a)
+        if node_a is None:
+            node_a = self.nodes[key_a] = Node(key_a)
+        node_b = self.nodes.get(key_b)
+        if node_b is None:
+            node_b = self.nodes[key_b] = Node(key_b)
+
+        self.edges[edge] = exp_time
+        node_a.neighbors.add(key_b)
+        self._increment(node_a)
+        node_b.neighbors.add(key_a)
+        self._increment(node_b)
+
+    def set_expiry(self, edge, exp_time):
+        """
+        Update the expiring time of an existing edge
+        """
+        self.edges[edge] = exp_time
+
+    def cut_edge(self, edge):
+        """
+        Cut the edge, and delete the node that has no neighbors any more
+        """
+        key_a, key_b = unpack(edge)
+        node_a = self.nodes[key_a]
+        node_b = self.nodes[key_b]
+
+        del self.edges[edge]
+        node_a.neighbors.remove(key_b)
+        node_b.neighbors.discard(key_a)         # a == b => already removed
+        self._decrement(node_a)
+        self._decrement(node_b)
+
+    def degree(self, name):
+        """
+        Degree of this user (0 if not in the graph)
+        """
+        node = self.nodes.get(self.ids.get(name))
+        return node.num_of_edges if node is not None else 0
+
+    def neighbors(self, name):
+        """
+        Return: list of (neighbor, expiring time of the edge) of this user, by name of neighbor
+        """
+        key = self.ids.get(name)
+        node = self.nodes.get(key)
+        if node is None:
+            return []
+        return sorted((self.names[other], self.edges[pack(key, other)]) for other in node.neighbors)
+
+    def top(self, k):
+        """
+        Return: list of (name, degree) of the k users of highest degree
+
+        Only the k highest populated degrees are visited (not every integer below the maximum),
+        and at most k users are taken from a bucket => O(distinct degrees + k log k).
+        Ties are by name within a bucket; at the last degree, when more users tie than there's
+        room for, any of them are taken (then sorted by name).
+        """
+        buckets = self.buckets
+        result = []
+        for degree in heapq.nlargest(k, buckets):
+            bucket = buckets[degree]
+            room = k - len(result)
+            if len(bucket) > room:
+                bucket = islice(bucket, room)
+            result.extend((name, degree) for name in sorted(self.names[key] for key in bucket))
+            if len(result) >= k:
+                break
+        return result
+
+    def _increment(self, node):
+        if self.degrees is not None:
+            self.degrees.increment(node.num_of_edges)
+        self._move(node.name, node.num_of_edges, node.num_of_edges + 1)
+        node.num_of_edges += 1
+
+    def _decrement(self, node):
+        if self.degrees is not None:
+            self.degrees.decrement(node.num_of_edges)
+        self._move(node.name, node.num_of_edges, node.num_of_edges - 1)
+        node.num_of_edges -= 1
+        if not node.num_of_edges:               # the node leaves the graph, and gives back its id
+            key = node.name
+            del self.nodes[key]
+            del self.ids[self.names[key]]
+            self.names[key] = None
+            self.free.append(key)
+
+    def _move(self, key, old, new):
+        """
+        From the bucket of degree old to the bucket of degree new (degree 0 => no bucket)
+        """
+        buckets = self.buckets
+        if old:
+            bucket = buckets[old]
+            bucket.remove(key)
+            if not bucket:
+                del buckets[old]
+        if new:
+            bucket = buckets.get(new)
+            if bucket is None:
+                bucket = buckets[new] = set()
+            bucket.add(key)
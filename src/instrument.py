@@ -0,0 +1,152 @@
+"""
+Opt-in instrumentation of the rolling median
+
+When it's on, record:
+1. calls and cumulative time of each stage (parse, duplicity, make_edge, cut_edge, find_median)
+2. number of transactions of each status (expired, repetitive but useless, repetitive but useful, new)
+3. gauges: edges in window, nodes in graph, current median
+4. medians recomputed, and skipped because the degrees didn't change
+5. with a reorder buffer (see reorder.py): transactions dropped as too late, and pending ones
+
+and dump them every N transactions, as plain text or in the Prometheus text format.
+
+When it's off, nothing is wrapped => no overhead at all.
+"""
+import os
+import time
+from rolling_graph import STATUSES
+
+STAGES = ('parse', 'duplicity', 'make_edge', 'cut_edge', 'find_median')
+
+class Stats(object):
+    """
+    Class of the statistics of a run
+
+    calls: key = stage, value = number of calls
+    seconds: key = stage, value = cumulative time
+    statuses: key = status of transaction, value = number of transactions
+    """
+    def __init__(self):
+        self.calls = dict((stage, 0) for stage in STAGES)
+        self.seconds = dict((stage, 0.0) for stage in STAGES)
+        self.statuses = dict((status, 0) for status in STATUSES)
+        self.engine = None
+        self.reorder = None
+
+    def wrap(self, stage, func):
+        """
+        Return: func, timed as this stage
+        """
+        calls = self.calls
+        seconds = self.seconds
+        clock = time.time
+
+        def timed(*args):
+            start = clock()
+            try:
+                return func(*args)
+            finally:
+                seconds[stage] += clock() - start
+                calls[stage] += 1
+        return timed
+
+    def timed_iter(self, stage, iterable):
+        """
+        Return: iterator of iterable, the time to get each item is timed as this stage
+        """
+        calls = self.calls
+        seconds = self.seconds
+        clock = time.time
+        iterator = iter(iterable)
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                seconds[stage] += clock() - start
+            calls[stage] += 1
+            yield item
+
+    def gauges(self):
+        gauges = {}
+        engine = self.engine
+        if engine is not None:
+            gauges['window_edges'] = len(engine.window or ())
+            gauges['graph_nodes'] = len(engine.graph)
+            gauges['median_degree'] = engine.median
+        if self.reorder is not None:
+            gauges['reorder_pending'] = len(self.reorder)
+        return gauges
+
+    def text(self):
+        lines = ['%-12s %10s %12s %10s' % ('stage', 'calls', 'seconds', 'us/call')]
+        for stage in STAGES:
+            calls = self.calls[stage]
+            lines.append('%-12s %10d %12.3f %10.2f' % (stage, calls, self.seconds[stage],
+                                                      self.seconds[stage] / calls * 1e6 if calls else 0))
+        for status in STATUSES:
+            lines.append('%-24s %10d' % (status, self.statuses[status]))
+        if self.engine is not None:
+            lines.append('%-24s %10d' % ('median recomputed', self.engine.recomputed))
+            lines.append('%-24s %10d' % ('median skipped', self.engine.skipped))
+        if self.reorder is not None:
+            lines.append('%-24s %10d' % ('dropped late', self.reorder.dropped))
+        for name, value in sorted(self.gauges().items()):
+            lines.append('%-24s %10s' % (name, value))
+        return '\n'.join(lines) + '\n'
+
+    def prometheus(self):
+        lines = ['# TYPE rolling_median_stage_calls_total counter']
+        for stage in STAGES:
+            lines.append('rolling_median_stage_calls_total{stage="%s"} %d' % (stage, self.calls[stage]))
+        lines.append('# TYPE rolling_median_stage_seconds_total counter')
+        for stage in STAGES:
+            lines.append('rolling_median_stage_seconds_total{stage="%s"} %.6f' % (stage, self.seconds[stage]))
+        lines.append('# TYPE rolling_median_transactions_total counter')
+        for status in STATUSES:
+            lines.append('rolling_median_transactions_total{status="%s"} %d' % (status, self.statuses[status]))
+        if self.engine is not None:
+            lines.append('# TYPE rolling_median_median_updates_total counter')
+            lines.append('rolling_median_median_updates_total{result="recomputed"} %d' % self.engine.recomputed)
+            lines.append('rolling_median_median_updates_total{result="skipped"} %d' % self.engine.skipped)
+        if self.reorder is not None:
+            lines.append('# TYPE rolling_median_dropped_late_total counter')
+            lines.append('rolling_median_dropped_late_total %d' % self.reorder.dropped)
+        for name, value in sorted(self.gauges().items()):
+            lines.append('# TYPE rolling_median_%s gauge' % name)
+            lines.append('rolling_median_%s %s' % (name, value))
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path, style='text'):
+        """
+        Write the stats into path (replaced in one go, so readers never see half of it)
+        """
+        temp = path + '.tmp'
+        with open(temp, 'w') as f:
+            f.write(self.prometheus() if style == 'prometheus' else self.text())
+        os.rename(temp, path)
+
+def instrument(engine, stats, path=None, every=10000, style='text'):
+    """
+    Time the stages of this engine (a RollingGraph), count the status of each transaction,
+    and dump the stats into path every N transactions.
+    """
+    stats.engine = engine
+    for stage in ('duplicity', 'make_edge', 'cut_edge', 'find_median'):
+        setattr(engine, stage, stats.wrap(stage, getattr(engine, stage)))
+
+    update = engine.update
+    statuses = stats.statuses
+    counter = [0]
+
+    def counted(transac_time, poi_a, poi_b):
+        median = update(transac_time, poi_a, poi_b)
+        statuses[engine.status] += 1
+        counter[0] += 1
+        if path and not counter[0] % every:
+            stats.dump(path, style)
+        return median
+    engine.update = counted
+    return engine
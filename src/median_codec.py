@@ -0,0 +1,109 @@
+"""
+Compact binary output of the medians, and the converter back to text
+
+Two formats, each file starts with 4 bytes of magic:
+1. 'RMF4' - one float32 per transaction (4 bytes instead of 5+ for "%.2f\\n").
+   Medians of degrees are multiples of 0.5, so float32 keeps them exactly.
+2. 'RMRL' - run-length records (float32 median, uint32 repeat count): the median seldom changes,
+   so a long replay shrinks to a few records per change.
+
+Usage (back to the text format of rolling_median_YJL.py):
+python src/median_codec.py ./venmo_output/output.bin ./venmo_output/output.txt
+"""
+import sys
+import struct
+import argparse
+from array import array
+
+F32 = 'RMF4'
+RLE = 'RMRL'
+RECORD = struct.Struct('<fI')           # median, repeat count
+RECORDS_PER_READ = 4096
+BLOCK = 65536                           # medians per write of float32
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+def write_f32(medians, output, flush=False):
+    """
+    Float32 writer: one float32 per median, written in blocks (flush => each one right away)
+    """
+    output.write(F32)
+    block = array('f')
+    for median in medians:
+        block.append(median)
+        if flush or len(block) >= BLOCK:
+            output.write(_little_endian(block).tostring())
+            block = array('f')
+            if flush:
+                output.flush()
+    output.write(_little_endian(block).tostring())
+
+def write_rle(medians, output, flush=False):
+    """
+    Run-length writer: one record per run of the same median (flush => each run as soon as it ends)
+    """
+    output.write(RLE)
+    last = None
+    count = 0
+    for median in medians:
+        if median == last and count < 0xFFFFFFFF:
+            count += 1
+            continue
+        if count:
+            output.write(RECORD.pack(last, count))
+            if flush:
+                output.flush()
+        last = median
+        count = 1
+    if count:
+        output.write(RECORD.pack(last, count))
+
+def read_medians(source):
+    """
+    Return: iterator of medians of a binary output (either format)
+    """
+    magic = source.read(4)
+    if magic == F32:
+        while True:
+            data = source.read(4 * BLOCK)
+            if not data:
+                return
+            block = array('f')
+            block.fromstring(data)
+            for median in _little_endian(block):
+                yield median
+    elif magic == RLE:
+        while True:
+            data = source.read(RECORD.size * RECORDS_PER_READ)
+            if not data:
+                return
+            for i in xrange(0, len(data), RECORD.size):
+                median, count = RECORD.unpack_from(data, i)
+                for _ in xrange(count):
+                    yield median
+    else:
+        raise ValueError('not a binary output of medians')
+
+WRITERS = {'f32': write_f32, 'rle': write_rle}
+
+def main():
+    from rolling_median_YJL import write_medians
+
+    parser = argparse.ArgumentParser(description='Convert a binary output of medians into text')
+    parser.add_argument('input', help='binary output (f32 or rle)')
+    parser.add_argument('output', help="txt file or '-' (stdout)")
+    args = parser.parse_args()
+
+    with open(args.input, 'rb') as source:
+        output = sys.stdout if args.output == '-' else open(args.output, 'w')
+        try:
+            write_medians(read_medians(source), output)
+        except ValueError as err:
+            parser.error('%s: %s' % (args.input, err))
+        output.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Time-travel index of the rolling median: the median at any point in time, without a replay
+
+Next to output.txt, a replay writes the change points of (latest created_time, median):
+one record each time the latest created_time seen moves on, or the median changes.
+The latest time never goes back, so the records are sorted by time => binary search.
+
+File: header (magic 'RMTI', version, number of transactions, number of records),
+then records of (latest created_time, ordinal of the first transaction, median as float32).
+The ordinal of a transaction is its line in output.txt (0, 1, 2, ...).
+
+The median at time T: the last record not later than T => O(log n) records read.
+The medians over [T1, T2]: the records between both => O(log n + records in range).
+
+Usage:
+python ./src/rolling_median_YJL.py --time-index ./venmo_output/output.tidx ./venmo_input/venmo-trans.txt ./venmo_output/output.txt
+python ./src/median_index.py ./venmo_output/output.tidx --at 2016-03-29T06:04:30Z
+python ./src/median_index.py ./venmo_output/output.tidx --at 2016-03-29T06:04:00Z --until 2016-03-29T06:05:00Z
+"""
+import mmap
+import time
+import struct
+import bisect
+import argparse
+
+from mmap_reader import parse_time
+
+MAGIC = 'RMTI'
+VERSION = 1
+HEADER = struct.Struct('<4sHqq')        # magic, version, transactions, records
+RECORD = struct.Struct('<qIf')          # latest created_time, ordinal, median
+BLOCK = 4096                            # records per write
+
+def format_time(seconds):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(seconds))
+
+class TimeIndexWriter(object):
+    """
+    Class of the writer of change points (written in blocks)
+
+    transactions, records: numbers written so far
+    """
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, 0))     # counts: see close
+        self.block = []
+        self.transactions = 0
+        self.records = 0
+
+    def add(self, latest, ordinal, median):
+        """
+        From this transaction on: this latest created_time, and this median
+        """
+        self.block.append(RECORD.pack(latest, ordinal, median))
+        if len(self.block) >= BLOCK:
+            self.flush()
+
+    def flush(self):
+        self.file.write(''.join(self.block))
+        self.records += len(self.block)
+        self.block = []
+
+    def close(self):
+        self.flush()
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.transactions, self.records))
+        self.file.close()
+
+def time_indexed(transactions, engine, path):
+    """
+    Window engine (see rolling_medians) that also writes the change points into path
+
+    Return: iterator of medians (one per transaction)
+    """
+    index = TimeIndexWriter(path)
+    latest = last = None
+    ordinal = 0
+    try:
+        for transac_time, poi_a, poi_b in transactions:
+            median = engine.update(transac_time, poi_a, poi_b)
+            if latest is None or transac_time > latest:
+                latest = transac_time
+                last = median
+                index.add(latest, ordinal, median)
+            elif median != last:
+                last = median
+                index.add(latest, ordinal, median)
+            ordinal += 1
+            yield median
+    finally:
+        index.transactions = ordinal
+        index.close()
+
+class Times(object):
+    """
+    The times of the records, as a sequence (for bisect)
+    """
+    def __init__(self, buf):
+        self.buf = buf
+        self.size = (len(buf) - HEADER.size) // RECORD.size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        return RECORD.unpack_from(self.buf, HEADER.size + i * RECORD.size)[0]
+
+class TimeIndex(object):
+    """
+    Class of a time-travel index (read from its file, mapped into memory)
+
+    transactions: number of transactions indexed
+    times: latest created_time of each record
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as source:
+            self.buf = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.buf) < HEADER.size:
+            raise ValueError('not a time index')
+        magic, version, self.transactions, records = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise ValueError('not a time index')
+        if version != VERSION:
+            raise ValueError('time index of version %d (expected %d)' % (version, VERSION))
+        self.times = Times(self.buf)
+        if len(self.times) != records:
+            raise ValueError('incomplete time index: %d of %d records' % (len(self.times), records))
+
+    def __len__(self):
+        return len(self.times)
+
+    def record(self, i):
+        """
+        Return: (latest created_time, first ordinal, last ordinal, median) of the i-th record
+        """
+        latest, first, median = RECORD.unpack_from(self.buf, HEADER.size + i * RECORD.size)
+        last = RECORD.unpack_from(self.buf, HEADER.size + (i + 1) * RECORD.size)[1] - 1 \
+            if i + 1 < len(self.times) else self.transactions - 1
+        return latest, first, last, median
+
+    def at(self, seconds):
+        """
+        Return: record in effect at this time (None => before the first transaction)
+        """
+        i = bisect.bisect_right(self.times, seconds) - 1
+        return self.record(i) if i >= 0 else None
+
+    def between(self, since, until):
+        """
+        Return: records of the transactions whose latest created_time is in [since, until]
+        """
+        lo = bisect.bisect_left(self.times, since)
+        hi = bisect.bisect_right(self.times, until)
+        return [self.record(i) for i in xrange(lo, hi)]
+
+def summary(records):
+    """
+    Return: (transactions, min, max, mean) of the medians of these records (mean over transactions)
+    """
+    count = sum(last - first + 1 for _, first, last, _ in records)
+    medians = [median for _, _, _, median in records]
+    total = sum((last - first + 1) * median for _, first, last, median in records)
+    return count, min(medians), max(medians), total / count
+
+def main():
+    parser = argparse.ArgumentParser(description='Median at a point in time, or over a time range')
+    parser.add_argument('index', help='time index written with --time-index')
+    parser.add_argument('--at', type=parse_time, required=True, metavar='TIME',
+                        help="created_time ('2016-03-28T23:23:12Z') or seconds since epoch")
+    parser.add_argument('--until', type=parse_time, metavar='TIME',
+                        help='end of the time range (each change of median in [--at, --until])')
+    args = parser.parse_args()
+
+    try:
+        index = TimeIndex(args.index)
+    except ValueError as err:
+        parser.error('%s: %s' % (args.index, err))
+
+    record = index.at(args.at)
+    if record is None:
+        print '%s: before the first transaction' % format_time(args.at)
+    else:
+        latest, first, last, median = record
+        print '%s %.2f (since %s, transactions %d-%d)' % (format_time(args.at), median,
+                                                           format_time(latest), first, last)
+    if args.until is None:
+        return
+    records = index.between(args.at, args.until)
+    for latest, first, last, median in records:
+        print '%s %.2f (transactions %d-%d)' % (format_time(latest), median, first, last)
+    if records:
+        print 'transactions %d, min %.2f, max %.2f, mean %.2f' % summary(records)
+
+if __name__ == '__main__':
+    main()
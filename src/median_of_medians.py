@@ -1,32 +1,114 @@
 """
 Implement of "median of medians" algorithm
 
-L: list of numbers
+Find the k-th smallest number in O(n), in place (L is partially reordered).
+
+1. introselect: quickselect with a median-of-3 pivot, fast on average...
+2. ...but after 2*log2(n) rounds, switch to the median-of-medians pivot => worst case O(n)
+3. three-way partition (< pivot, == pivot, > pivot), so lists full of duplicates
+   (e.g. degrees: mostly 1 or 2) are done in very few rounds.
+
+L: list of numbers (also works on array('i') or numpy arrays)
 """
-def select(L):
-    if len(L) <= 10:
-        L.sort()
-        return L[int(len(L)/2)]         # Here doesn't work for length = even
-    S = []
-    lIndex = 0
-    while lIndex+5 < len(L)-1:
-        S.append(L[lIndex:lIndex+5])
-        lIndex += 5
-    S.append(L[lIndex:])
-    meds = []
-    for subList in S:
-        #print(subList)
-        meds.append(select(subList))
-    L2 = select(meds)
-    L1 = L3 = []
-    for i in L:
-        if i < L2:
-            L1.append(i)
-        if i > L2:
-            L3.append(i)
-    if len(L) < len(L1):
-        return select(L1)
-    elif len(L) > len(L1) + 1:
-        return select(L3)
-    else:
-        return L2
\ No newline at end of file
+
+def median(L):
+    """
+    Median of L (the average of both middle numbers if len(L) is even), same as numpy.median
+
+    L is reordered.
+    """
+    n = len(L)
+    if not n:
+        return float('nan')
+    k = (n - 1) // 2
+    lower = select(L, k)
+    if n % 2:
+        return float(lower)
+    upper = min(L[k+1:])            # after select, everything right of k is >= L[k]
+    return (lower + upper) / 2.0
+
+def select(L, k, lo=0, hi=None):
+    """
+    The k-th smallest number (k = 0, 1, ...) in L[lo:hi]
+
+    After that, L[lo:k] <= L[k] <= L[k+1:hi]
+    """
+    if hi is None:
+        hi = len(L)
+    budget = 2 * (hi - lo).bit_length()         # rounds of quickselect before falling back
+
+    while True:
+        if hi - lo <= 10:
+            insertion_sort(L, lo, hi)
+            return L[k]
+
+        if budget:
+            budget -= 1
+            pivot = median_of_3(L, lo, hi)
+        else:
+            pivot = median_of_medians(L, lo, hi)
+
+        lt, gt = partition(L, lo, hi, pivot)
+        if k < lt:
+            hi = lt
+        elif k >= gt:
+            lo = gt
+        else:
+            return pivot
+
+def partition(L, lo, hi, pivot):
+    """
+    Three-way partition of L[lo:hi]
+
+    Return: (lt, gt) => L[lo:lt] < pivot, L[lt:gt] == pivot, L[gt:hi] > pivot
+    """
+    lt = i = lo
+    gt = hi
+    while i < gt:
+        x = L[i]
+        if x < pivot:
+            L[i] = L[lt]
+            L[lt] = x
+            lt += 1
+            i += 1
+        elif x > pivot:
+            gt -= 1
+            L[i] = L[gt]
+            L[gt] = x
+        else:
+            i += 1
+    return lt, gt
+
+def median_of_3(L, lo, hi):
+    a = L[lo]
+    b = L[(lo + hi) // 2]
+    c = L[hi - 1]
+    if a > b:
+        a, b = b, a
+    if b > c:
+        b = c
+    return max(a, b)
+
+def median_of_medians(L, lo, hi):
+    """
+    Pivot that is guaranteed to be between the 30% and 70% of L[lo:hi]
+
+    Sort each group of 5, move its median to the front, and select the median of them.
+    """
+    front = lo
+    for start in xrange(lo, hi, 5):
+        end = min(start + 5, hi)
+        insertion_sort(L, start, end)
+        mid = start + (end - start - 1) // 2
+        L[front], L[mid] = L[mid], L[front]
+        front += 1
+    return select(L, lo + (front - lo - 1) // 2, lo, front)
+
+def insertion_sort(L, lo, hi):
+    for i in xrange(lo + 1, hi):
+        x = L[i]
+        j = i - 1
+        while j >= lo and L[j] > x:
+            L[j+1] = L[j]
+            j -= 1
+        L[j+1] = x
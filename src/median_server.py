@@ -0,0 +1,234 @@
+"""
+Rolling median as a local network service
+
+One process, one rolling graph, many connections (asyncore: one event loop, no threads).
+
+Producers send newline-delimited transactions (the same JSON as the lines of the input file).
+They're applied in the order they arrive, and each read is acknowledged once, not each line:
+    ACK <applied> <incorrect> <median>
+
+Clients send commands, one per line (names in UTF-8):
+    MEDIAN          => MEDIAN <median>
+    DEGREE <name>   => DEGREE <degree> <name>
+    NEIGHBORS <name> => NEIGHBORS <name> followed by one line per neighbor: <expiring time> <neighbor>, then END
+    TOP <k>         => TOP <k> followed by one line per user: <degree> <name>, then END
+    SUBSCRIBE       => MEDIAN <median> now, and every time the median changes
+    UNSUBSCRIBE
+
+Backpressure: a connection with more than HIGH_WATER bytes of replies unsent is not read
+until they drain, so a fast producer is slowed down by TCP instead of growing the server.
+A slow subscriber skips the medians in between, and gets the latest one once it catches up.
+
+Usage:
+python src/median_server.py tcp://127.0.0.1:9000
+python src/median_server.py unix:///tmp/venmo.sock --span 60
+"""
+import argparse
+import asyncore
+
+from rolling_graph import RollingGraph
+from trans_parser import parse_line, MalformedLine
+from rolling_median_YJL import bind
+
+READ_SIZE = 65536               # bytes per read => lines per acknowledgment
+HIGH_WATER = 65536              # bytes of unsent replies before a connection is no longer read
+MAX_LINE = 1 << 20              # a longer line closes the connection
+
+class MedianServer(asyncore.dispatcher):
+    """
+    Class of the listening socket, and the state shared by every connection
+
+    engine: the rolling graph
+    subscribers: connections to notify of each new median
+    published: the latest median sent to subscribers
+    """
+    def __init__(self, address, engine):
+        asyncore.dispatcher.__init__(self)
+        server = bind(address)
+        server.setblocking(0)
+        self.set_socket(server)
+        self.listen(128)
+        self.engine = engine
+        self.subscribers = set()
+        self.published = None
+        self.applied = 0        # number of transactions applied
+        self.incorrect = 0      # number of incorrect lines
+
+    def handle_accept(self):
+        pair = self.accept()
+        if pair is not None:
+            Connection(pair[0], self)
+
+    def publish(self):
+        """
+        Notify the subscribers, if the median has changed
+        """
+        median = self.engine.median
+        if median == self.published:
+            return
+        self.published = median
+        for connection in list(self.subscribers):
+            connection.notify(median)
+
+def from_utf8(name):
+    """
+    Name in a command (bytes) => name in the graph (as decoded from the JSON of transactions)
+    """
+    return name.decode('utf-8', 'replace')
+
+def to_utf8(name):
+    """
+    Name in the graph => bytes of a reply
+    """
+    return name.encode('utf-8') if isinstance(name, unicode) else name
+
+class Connection(asyncore.dispatcher):
+    """
+    Class of a connection (producer, client, or both)
+
+    inbox: the incomplete line at the end of the latest read
+    outbox: replies not sent yet
+    """
+    def __init__(self, sock, server):
+        asyncore.dispatcher.__init__(self, sock)
+        self.server = server
+        self.inbox = ''
+        self.outbox = []
+        self.unsent = 0         # bytes in outbox
+        self.missed = False     # a median was skipped (subscriber too slow)
+        self.closing = False    # the peer is done sending => close once the replies are sent
+
+    def readable(self):
+        return not self.closing and self.unsent < HIGH_WATER
+
+    def writable(self):
+        return self.unsent > 0
+
+    def reply(self, message):
+        self.outbox.append(message + '\n')
+        self.unsent += len(message) + 1
+
+    def notify(self, median):
+        if self.unsent >= HIGH_WATER:
+            self.missed = True
+        else:
+            self.reply('MEDIAN %.2f' % median)
+
+    def handle_read(self):
+        data = self.recv(READ_SIZE)
+        if not data:                            # end of input (see handle_close)
+            return
+        lines = (self.inbox + data).split('\n')
+        self.inbox = lines.pop()
+        if len(self.inbox) > MAX_LINE:
+            self.close()
+            return
+        self.apply(lines)
+
+    def apply(self, lines):
+        """
+        Run the commands, feed the transactions into the engine, and acknowledge them at once
+        """
+        server = self.server
+        engine = server.engine
+        applied = incorrect = 0
+        for line in lines:
+            command = line.split(None, 1)
+            if not command:
+                continue
+            if command[0] in COMMANDS:
+                COMMANDS[command[0]](self, command[1].strip() if len(command) > 1 else '')
+                continue
+            try:
+                engine.update(*parse_line(line))
+                applied += 1
+            except MalformedLine:
+                incorrect += 1
+        if applied or incorrect:
+            server.applied += applied
+            server.incorrect += incorrect
+            self.reply('ACK %d %d %.2f' % (applied, incorrect, engine.median))
+            server.publish()
+
+    def handle_write(self):
+        data = ''.join(self.outbox)
+        sent = self.send(data)
+        self.outbox = [data[sent:]] if sent < len(data) else []
+        self.unsent = len(data) - sent
+        if self.missed and self.unsent < HIGH_WATER:        # caught up => only the latest median
+            self.missed = False
+            self.notify(self.server.engine.median)
+        if self.closing and not self.unsent:
+            self.close()
+
+    def close(self):
+        """
+        Close the connection, and stop notifying it (whatever the reason: end of input, too long a line...)
+        """
+        self.server.subscribers.discard(self)
+        asyncore.dispatcher.close(self)
+
+    def handle_close(self):
+        """
+        The peer is done sending: apply the last line (if it has no newline), and close after the replies
+        """
+        self.server.subscribers.discard(self)
+        if self.closing:
+            self.close()
+            return
+        self.closing = True
+        if self.inbox:
+            self.apply([self.inbox])
+            self.inbox = ''
+        if not self.unsent:
+            self.close()
+
+    def median(self, _):
+        self.reply('MEDIAN %.2f' % self.server.engine.median)
+
+    def degree(self, name):
+        self.reply('DEGREE %d %s' % (self.server.engine.degree(from_utf8(name)), name))
+
+    def neighbors(self, name):
+        self.reply('NEIGHBORS %s' % name)
+        for neighbor, exp_time in self.server.engine.neighbors(from_utf8(name)):
+            self.reply('%d %s' % (exp_time, to_utf8(neighbor)))
+        self.reply('END')
+
+    def top(self, k):
+        k = int(k) if k.isdigit() else 10
+        self.reply('TOP %d' % k)
+        for name, degree in self.server.engine.top(k):
+            self.reply('%d %s' % (degree, to_utf8(name)))
+        self.reply('END')
+
+    def subscribe(self, _):
+        self.server.subscribers.add(self)
+        self.median(_)
+
+    def unsubscribe(self, _):
+        self.server.subscribers.discard(self)
+
+COMMANDS = {
+    'MEDIAN': Connection.median,
+    'DEGREE': Connection.degree,
+    'NEIGHBORS': Connection.neighbors,
+    'TOP': Connection.top,
+    'SUBSCRIBE': Connection.subscribe,
+    'UNSUBSCRIBE': Connection.unsubscribe,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description='Rolling median degree of Venmo users, as a local service')
+    parser.add_argument('address', help='tcp://host:port or unix:///path')
+    parser.add_argument('--span', type=int, default=60, help='length of the window (in seconds)')
+    args = parser.parse_args()
+
+    MedianServer(args.address, RollingGraph(args.span))
+    try:
+        asyncore.loop(timeout=1.0, use_poll=True)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Memory report: bytes per active edge of the rolling graph
+
+Feed synthetic transactions (see venmo_generator.py) into a rolling graph,
+then walk degree histogram, graph and window and add up sys.getsizeof of every object
+reachable from them (each object counted once, in the first part that reaches it:
+the graph refers to the same degree histogram, and shares keys with the window).
+
+Usage:
+python src/memory_report.py --events 200000 --users 100000 --rate 2000
+"""
+import sys
+import argparse
+
+import venmo_generator
+from rolling_graph import RollingGraph
+from trans_parser import parse_line, MalformedLine
+
+def deep_sizeof(root, seen=None):
+    """
+    Return: total size (in bytes) of all objects reachable from root (but not of those already seen)
+    """
+    seen = set() if seen is None else seen
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or obj is None:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.iterkeys())
+            stack.extend(obj.itervalues())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, (basestring, int, long, float)):
+            continue
+        if hasattr(obj, '__dict__'):
+            stack.append(obj.__dict__)
+        for slot in getattr(type(obj), '__slots__', ()):
+            stack.append(getattr(obj, slot, None))
+    return total
+
+def report(engine):
+    """
+    Return: dictionary of sizes of the parts of this engine
+    """
+    edges = len(engine.window)
+    seen = set()
+    sizes = {
+        'edges': edges,
+        'nodes': len(engine.graph),
+        'degrees_bytes': deep_sizeof(engine.degrees, seen),
+        'graph_bytes': deep_sizeof(engine.graph, seen),         # without the degrees
+        'window_bytes': deep_sizeof(engine.window, seen),
+    }
+    sizes['total_bytes'] = sizes['graph_bytes'] + sizes['window_bytes'] + sizes['degrees_bytes']
+    sizes['bytes_per_edge'] = sizes['total_bytes'] / float(edges) if edges else 0.0
+    return sizes
+
+def main():
+    parser = argparse.ArgumentParser(description='Bytes per active edge of the rolling graph')
+    parser.add_argument('--events', type=int, default=200000)
+    venmo_generator.add_arguments(parser)
+    parser.set_defaults(users=100000, rate=2000.0, late=0.0)
+    args = parser.parse_args()
+
+    engine = RollingGraph()
+    for line in venmo_generator.generate(args.events, **venmo_generator.options(args)):
+        try:
+            engine.update(*parse_line(line))
+        except MalformedLine:
+            pass
+
+    sizes = report(engine)
+    for name in ('edges', 'nodes', 'graph_bytes', 'window_bytes', 'degrees_bytes', 'total_bytes'):
+        print '%-16s %12d' % (name, sizes[name])
+    print '%-16s %12.1f' % ('bytes_per_edge', sizes['bytes_per_edge'])
+
+if __name__ == '__main__':
+    main()
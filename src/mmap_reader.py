@@ -0,0 +1,174 @@
+"""
+Memory-mapped input reader, with a sidecar index of (byte offset, created_time)
+
+1. the file is mapped instead of read through text I/O; lines are found with find('\\n')
+   over the mapping, and each line is sliced out of it once (no read-ahead buffer, no copy of the file).
+2. every N lines, record the byte offset and the created_time of the first valid line from there.
+   The index is kept next to the input (venmo-trans.txt => venmo-trans.txt.idx),
+   and rebuilt whenever the input has changed since.
+3. with the index, a time range can be processed without reading the whole file:
+   jump to a few indexed lines before the start, warm the window up with the lines
+   of the preceding seconds (no output), then compute from the first line of the range.
+
+Times in the index are in the order of the file, so a log that is (roughly) in time order is assumed:
+the lines before the warm-up must not be later than since.
+"""
+import os
+import mmap
+import bisect
+import struct
+from array import array
+
+from trans_parser import parse_line, epoch_seconds, MalformedLine
+
+INDEX_SUFFIX = '.idx'
+INDEX_EVERY = 10000             # lines between two entries of the index
+MAGIC = 'RMIX'
+VERSION = 1
+HEADER = struct.Struct('<4sHqqq')   # magic, version, every, size of input, mtime of input
+
+def map_file(path):
+    """
+    Return: read-only mapping of the file ('' if it's empty, which can't be mapped)
+    """
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return ''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def mmap_lines(buf, start=0, stop=None):
+    """
+    Return: iterator of the lines of buf, from byte offset start (a line boundary) to stop
+    """
+    stop = len(buf) if stop is None else stop
+    find = buf.find
+    pos = start
+    while pos < stop:
+        end = find('\n', pos, stop)
+        end = stop if end < 0 else end + 1
+        yield buf[pos:end]
+        pos = end
+
+def line_time(line):
+    """
+    Return: seconds of this line (None if it's incorrect)
+    """
+    try:
+        return parse_line(line)[0]
+    except MalformedLine:
+        return None
+
+def parse_time(text):
+    """
+    A point in time: created_time ('2016-03-28T23:23:12Z') or seconds since epoch
+
+    Return: seconds since epoch (ValueError if it's neither)
+    """
+    seconds = epoch_seconds(text)
+    if seconds is None:
+        seconds = int(text)
+    return seconds
+
+def build_index(buf, every=INDEX_EVERY):
+    """
+    Scan buf once, record (offset, seconds) of the first valid line of every N lines
+
+    Return: (offsets, times), both array('l')
+    """
+    offsets = array('l')
+    times = array('l')
+    find = buf.find
+    pos = 0
+    count = 0
+    pending = False             # an entry is due, waiting for a valid line
+    while pos < len(buf):
+        end = find('\n', pos)
+        end = len(buf) if end < 0 else end + 1
+        if not count % every:
+            pending = True
+        if pending:
+            seconds = line_time(buf[pos:end])
+            if seconds is not None:
+                offsets.append(pos)
+                times.append(seconds)
+                pending = False
+        count += 1
+        pos = end
+    return offsets, times
+
+def save_index(path, stamp, index, every):
+    offsets, times = index
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, every, stamp[0], stamp[1]))
+        f.write(offsets.tostring())
+        f.write(times.tostring())
+    os.rename(temp, path)
+
+def load_index(path, stamp, every):
+    """
+    Return: (offsets, times) of the index file, or None if it's missing or stale
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+            data = f.read()
+    except IOError:
+        return None
+    if len(header) < HEADER.size or HEADER.unpack(header) != (MAGIC, VERSION, every, stamp[0], stamp[1]):
+        return None
+    offsets = array('l')
+    offsets.fromstring(data[:len(data) // 2])
+    times = array('l')
+    times.fromstring(data[len(data) // 2:])
+    return offsets, times
+
+def time_index(input_path, buf, every=INDEX_EVERY):
+    """
+    Index of this input: load the sidecar file, or build it (and keep it, if possible)
+    """
+    info = os.stat(input_path)
+    stamp = (info.st_size, int(info.st_mtime))
+    path = input_path + INDEX_SUFFIX
+    index = load_index(path, stamp, every)
+    if index is None:
+        index = build_index(buf, every)
+        try:
+            save_index(path, stamp, index, every)
+        except (IOError, OSError):              # read-only directory => index in memory only
+            pass
+    return index
+
+def time_range(buf, index, since, warmup):
+    """
+    Where to start for the lines since this time
+
+    Lines can be out of order, so the entries are searched by the latest time up to each one
+    (it never goes back): a late line further on can't pull the range past its first line.
+    The warm-up starts at the last entry whose latest time is at least warmup seconds before since,
+    and the range at the first line of time >= since after it.
+
+    Return: (offset to warm the window up from, offset of the first line of time >= since)
+    """
+    offsets, times = index
+    latest = []
+    for seconds in times:
+        latest.append(max(seconds, latest[-1]) if latest else seconds)
+    entry = bisect.bisect_right(latest, since - warmup) - 1
+    warm = scan = offsets[entry] if entry >= 0 else 0
+
+    for line in mmap_lines(buf, scan):
+        seconds = line_time(line)
+        if seconds is not None and seconds >= since:
+            break
+        scan += len(line)
+    return warm, scan
+
+def until(transactions, stop):
+    """
+    Return: iterator of transactions, up to the first one later than stop
+    """
+    for transaction in transactions:
+        if transaction[0] > stop:
+            return
+        yield transaction
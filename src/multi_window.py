@@ -0,0 +1,75 @@
+"""
+Several windows and statistics in one pass
+
+e.g. 60s, 5min and 1h windows, each with median, p90, p99 and max degree:
+the input is read and parsed once, and each transaction is fed into one rolling graph per window.
+
+Output: one line per transaction for each window, with the value of each statistic.
+"""
+import os
+from rolling_graph import RollingGraph
+from degree_median import check_statistic
+
+class MultiWindowGraph(object):
+    """
+    Class of rolling graphs sharing one pass of the input
+
+    spans: lengths of windows (in seconds)
+    statistics: names of statistics of degrees
+    alpha: relative error of approximate statistics (None => exact)
+    backend: backend of statistics of degrees (see degree_backends.py)
+    engines: one rolling graph per window
+    rows: latest values of statistics, one row per window
+    """
+    def __init__(self, spans=(60,), statistics=('median',), alpha=None, backend='auto'):
+        self.spans = tuple(spans)
+        self.statistics = tuple(check_statistic(name) for name in statistics)
+        self.engines = [RollingGraph(span, alpha, backend) for span in self.spans]
+        self.rows = [None] * len(self.engines)
+
+    def __repr__(self):
+        return '; '.join('%ds: %r' % (span, engine) for span, engine in zip(self.spans, self.engines))
+
+    def update(self, transac_time, poi_a, poi_b):
+        """
+        Feed one transaction into every window
+
+        Return: list of rows (one per window), row = tuple of statistics
+        """
+        rows = self.rows
+        for i, engine in enumerate(self.engines):
+            engine.update(transac_time, poi_a, poi_b)
+            if engine.changed or rows[i] is None:           # same degrees => same statistics
+                rows[i] = tuple(engine.statistic(name) for name in self.statistics)
+        return list(rows)
+
+def window_paths(path, spans):
+    """
+    Output file of each window: output.txt => output.60s.txt, output.300s.txt, ...
+    (just path itself if there's only one window)
+    """
+    if len(spans) == 1:
+        return [path]
+    root, ext = os.path.splitext(path)
+    return ['%s.%ds%s' % (root, span, ext) for span in spans]
+
+def multi_window_rows(transactions, engine):
+    """
+    Return: iterator of rows of each window (one item per transaction)
+    """
+    for transac_time, poi_a, poi_b in transactions:
+        yield engine.update(transac_time, poi_a, poi_b)
+
+def write_rows(rows, outputs, flush=False):
+    """
+    Write the statistics of each window into its own output, one line per transaction
+    """
+    last = [None] * len(outputs)                # (row, formatted line) of each window
+    for row_of_windows in rows:
+        for i, row in enumerate(row_of_windows):
+            if last[i] is None or last[i][0] != row:
+                last[i] = (row, ' '.join('%.2f' % value for value in row) + '\n')
+            outputs[i].write(last[i][1])
+        if flush:
+            for output in outputs:
+                output.flush()
@@ -0,0 +1,99 @@
+"""
+Time-partitioned parallel replay of one large log
+
+The median only depends on the edges of the latest window, so the file is cut into partitions
+(at lines of its time index, see mmap_reader.py) and each one is replayed by its own process:
+
+1. start the rolling graph with the first time of the whole log (so the window starts as in one serial run)
+2. warm it up with the lines of the `warmup` seconds before the partition (no output)
+3. write the medians of the partition into a part file (incorrect lines into a report file)
+
+Then the part files are stitched together in order => the same output as one serial run,
+as long as no line is more than (warmup - window) seconds older than a line before it.
+(A late line elsewhere in the file doesn't shorten the warm-up: see time_range.)
+"""
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+from rolling_graph import RollingGraph
+from mmap_reader import map_file, mmap_lines, time_index, time_range
+
+def plan(input_path, parts, warmup, index_every):
+    """
+    Cut the input into (at most) this many partitions of about the same size
+
+    Return: list of (warm from, start, stop) byte offsets, and the first time of the log
+    """
+    buf = map_file(input_path)
+    index = time_index(input_path, buf, index_every)
+    offsets, times = index
+    if not offsets:                             # no transaction at all
+        return [(0, 0, len(buf))], None
+
+    entries = [0]                               # entry of the index where each partition starts
+    for k in xrange(1, parts):
+        target = len(buf) * k // parts
+        entry = min(xrange(len(offsets)), key=lambda i: abs(offsets[i] - target))
+        if offsets[entry] > offsets[entries[-1]]:
+            entries.append(entry)
+    starts = [0] + [offsets[entry] for entry in entries[1:]]
+    stops = starts[1:] + [len(buf)]
+
+    partitions = [(0, 0, stops[0])]
+    for entry, start, stop in zip(entries[1:], starts[1:], stops[1:]):
+        warm, _ = time_range(buf, index, times[entry], warmup)     # before start, whatever comes later
+        partitions.append((warm, start, stop))
+    return partitions, times[0]
+
+def replay_partition(job):
+    """
+    Worker: replay one partition into its part file (and report file)
+
+    Return: (path of part file, path of report file)
+    """
+    from rolling_median_YJL import parse_transactions, rolling_medians, write_medians
+
+    input_path, (warm, start, stop), first_time, span, part_path = job
+    buf = map_file(input_path)
+    engine = RollingGraph(span)
+    if first_time is not None:
+        engine.start(first_time)
+
+    devnull = open(os.devnull, 'w')
+    for transaction in parse_transactions(mmap_lines(buf, warm, start), devnull):
+        engine.update(*transaction)
+
+    report_path = part_path + '.report'
+    with open(part_path, 'w') as output:
+        with open(report_path, 'w') as report:
+            transactions = parse_transactions(mmap_lines(buf, start, stop), report)
+            write_medians(rolling_medians(transactions, engine), output)
+    return part_path, report_path
+
+def partitioned_replay(input_path, output, report, parts, processes, span=60, warmup=None,
+                       index_every=10000):
+    """
+    Replay the input in parallel partitions, and stitch their medians into output (reports into report)
+    """
+    warmup = 2 * span if warmup is None else warmup
+    processes = multiprocessing.cpu_count() if processes is None else processes
+    partitions, first_time = plan(input_path, parts, warmup, index_every)
+    temp_dir = tempfile.mkdtemp(prefix='partitions-')
+    jobs = [(input_path, partition, first_time, span, os.path.join(temp_dir, 'part%05d.txt' % i))
+            for i, partition in enumerate(partitions)]
+
+    pool = multiprocessing.Pool(min(processes, len(jobs)))
+    try:
+        for part_path, report_path in pool.imap(replay_partition, jobs):     # in order of partitions
+            for path, stream in ((report_path, report), (part_path, output)):
+                with open(path, 'r') as part:
+                    shutil.copyfileobj(part, stream)
+                os.remove(path)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return len(partitions)
@@ -0,0 +1,89 @@
+"""
+Two-stage pipeline for one stream: parser process -> engine process
+
+The parser process reads and parses the lines, interns actor/target into integer ids,
+and sends compact batches (three array('l') of seconds, id_a, id_b) through a pipe.
+Meanwhile, the engine process (the caller) feeds the previous batch into the rolling graph.
+
+The order of transactions is kept, so the output is the same as the one-process path,
+and the throughput is bounded by the slower stage instead of the sum of both.
+(The pipe buffer is bounded => a fast parser waits for a slow engine.)
+
+Note: medians come out one batch at a time, so a stream waits up to BATCH lines.
+"""
+import os
+import sys
+import multiprocessing
+from array import array
+
+from trans_parser import parse_line, MalformedLine
+
+BATCH = 4096                    # transactions per batch
+
+def parser_worker(source, conn, report_to_stderr, batch_size, stdin_fd=None):
+    """
+    Parser process: lines -> batches of (seconds, id_a, id_b)
+
+    Incorrect lines are reported (to stdout, or stderr) and skipped.
+    """
+    from rolling_median_YJL import read_lines
+
+    report = sys.stderr if report_to_stderr else sys.stdout
+    if stdin_fd is not None:                    # multiprocessing closes stdin of the child
+        lines = iter(os.fdopen(stdin_fd, 'r').readline, '')
+    else:
+        lines = read_lines(source)
+
+    ids = {}                                    # key = name, value = id
+    times = array('l')
+    id_a = array('l')
+    id_b = array('l')
+
+    for line in lines:
+        try:
+            transac_time, poi_a, poi_b = parse_line(line)
+        except MalformedLine as err:
+            print >>report, str(err), line
+            continue
+        times.append(transac_time)
+        id_a.append(ids.setdefault(poi_a, len(ids)))
+        id_b.append(ids.setdefault(poi_b, len(ids)))
+        if len(times) >= batch_size:
+            conn.send_bytes(times.tostring() + id_a.tostring() + id_b.tostring())
+            times, id_a, id_b = array('l'), array('l'), array('l')
+
+    if times:
+        conn.send_bytes(times.tostring() + id_a.tostring() + id_b.tostring())
+    report.flush()
+    conn.send_bytes('')                         # end of stream
+    conn.close()
+
+def pipelined_transactions(source, report=None, batch_size=BATCH):
+    """
+    Engine side: start the parser process, and receive its batches
+
+    Return: iterator of transactions (seconds, id_a, id_b), in the order of the input
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    stdin_fd = os.dup(sys.stdin.fileno()) if source == '-' else None
+    parser = multiprocessing.Process(target=parser_worker,
+                                     args=(source, sender, report is sys.stderr, batch_size, stdin_fd))
+    parser.daemon = True
+    parser.start()
+    sender.close()
+    if stdin_fd is not None:
+        os.close(stdin_fd)
+
+    try:
+        while True:
+            data = receiver.recv_bytes()
+            if not data:
+                break
+            batch = array('l')
+            batch.fromstring(data)
+            n = len(batch) // 3
+            for transaction in zip(batch[:n], batch[n:2*n], batch[2*n:]):
+                yield transaction
+    finally:
+        receiver.close()
+        parser.join()
@@ -0,0 +1,76 @@
+"""
+Event-time ingestion: reorder buffer with an allowed lateness
+
+Upstream producers are skewed by a bounded delay, so transactions arrive nearly (not exactly) in time order.
+A heap keyed by created_time holds each transaction until the latest created_time seen
+is `lateness` seconds past it, then hands it to the engine => the engine sees them in time order,
+and the common path (a new edge in the latest second) is append-only.
+
+A transaction arriving after later ones have already been handed out is too late: it's dropped and counted.
+(Transactions of the same second keep the order of the input.)
+"""
+import heapq
+
+class ReorderBuffer(object):
+    """
+    Class of a reorder buffer
+
+    lateness: how long (in seconds) a transaction may arrive after a later one
+    heap: pending transactions, key = (created_time, order of arrival)
+    latest: latest created_time seen
+    watermark: created_time of the last transaction handed out
+    """
+    def __init__(self, lateness):
+        self.lateness = lateness
+        self.heap = []
+        self.latest = None
+        self.watermark = None
+        self.received = 0       # number of transactions pushed
+        self.released = 0       # number of transactions handed out
+        self.dropped = 0        # number of transactions dropped (too late)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __repr__(self):
+        return '%d pending, %d released, %d dropped' % (len(self.heap), self.released, self.dropped)
+
+    def push(self, transaction):
+        """
+        Return: list of transactions that can be handed out now (in time order)
+        """
+        transac_time = transaction[0]
+        self.received += 1
+        if self.watermark is not None and transac_time < self.watermark:
+            self.dropped += 1
+            return []
+        heapq.heappush(self.heap, (transac_time, self.received, transaction))
+        if self.latest is None or transac_time > self.latest:
+            self.latest = transac_time
+        return self._release(self.latest - self.lateness)
+
+    def drain(self):
+        """
+        Return: all pending transactions (end of input)
+        """
+        return self._release(None)
+
+    def _release(self, until):
+        heap = self.heap
+        released = []
+        while heap and (until is None or heap[0][0] <= until):
+            released.append(heapq.heappop(heap)[2])
+        if released:
+            self.watermark = released[-1][0]
+            self.released += len(released)
+        return released
+
+def reordered(transactions, buffer):
+    """
+    Return: iterator of transactions in time order (the late ones are dropped, see ReorderBuffer)
+    """
+    for transaction in transactions:
+        for ready in buffer.push(transaction):
+            yield ready
+    for ready in buffer.drain():
+        yield ready
@@ -0,0 +1,147 @@
+"""
+Replay many independent transaction logs (e.g. one per region/day) on all cores
+
+Each input file is an independent stream: a pool of worker processes takes one file at a time,
+runs its own rolling graph over it, and writes its medians next to the input
+(name.txt => name.output.txt, or into --out-dir). While one worker parses its lines,
+the others compute, so the pool keeps every core busy.
+
+At the end, a combined summary (one entry per input) is written as JSON.
+
+Usage:
+python src/replay_pool.py 'logs/*.txt' --processes 32 --summary summary.json
+python src/replay_pool.py logs/ --out-dir replays/
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import multiprocessing
+
+from rolling_graph import RollingGraph
+from rolling_median_YJL import parse_transactions, rolling_medians, write_medians
+
+OUTPUT_SUFFIX = '.output.txt'
+
+def find_inputs(patterns):
+    """
+    Return: input files of directories (every *.txt inside), glob patterns or files
+    """
+    inputs = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*.txt')
+        inputs.extend(path for path in sorted(glob.glob(pattern))
+                      if os.path.isfile(path) and not path.endswith(OUTPUT_SUFFIX))
+    return inputs
+
+def output_path(input_path, out_dir=None):
+    """
+    name.txt => name.output.txt (next to the input, or in out_dir)
+    """
+    root = os.path.splitext(input_path)[0]
+    if out_dir:
+        root = os.path.join(out_dir, os.path.basename(root))
+    return root + OUTPUT_SUFFIX
+
+class Counted(object):
+    """
+    Class of an iterator that counts its items (lines, transactions)
+    """
+    def __init__(self, items):
+        self.items = iter(items)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        item = next(self.items)
+        self.count += 1
+        return item
+
+def replay(job):
+    """
+    Worker: replay one input file into its output
+
+    Return: summary of this replay (dictionary)
+    """
+    input_path, output_path, batch = job
+    start = time.time()
+    engine = RollingGraph()
+    report = open(os.devnull, 'w')
+
+    with open(input_path, 'r') as input_file:
+        with open(output_path, 'w') as output:
+            if batch:
+                from batch_ingest import read_chunks, batch_transactions
+                lines = None
+                transactions = Counted(batch_transactions(read_chunks(input_file), report))
+            else:
+                lines = Counted(input_file)
+                transactions = Counted(parse_transactions(lines, report))
+            write_medians(rolling_medians(transactions, engine), output)
+
+    elapsed = time.time() - start
+    summary = {
+        'input': input_path,
+        'output': output_path,
+        'transactions': transactions.count,
+        'seconds': elapsed,
+        'transactions_per_sec': transactions.count / elapsed if elapsed else 0.0,
+        'final_median': engine.median,
+        'window_edges': len(engine.window or ()),
+        'graph_nodes': len(engine.graph),
+    }
+    if lines is not None:
+        summary['lines'] = lines.count
+        summary['malformed'] = lines.count - transactions.count
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay many transaction logs in parallel')
+    parser.add_argument('inputs', nargs='+', help='input files, directories or glob patterns')
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--out-dir', help='write the outputs here instead of next to the inputs')
+    parser.add_argument('--summary', default='replay_summary.json', help='combined summary (JSON)')
+    parser.add_argument('--batch', action='store_true', help='batch ingest with numpy (see batch_ingest.py)')
+    args = parser.parse_args()
+
+    inputs = find_inputs(args.inputs)
+    if not inputs:
+        parser.error('no input files')
+    if args.out_dir and not os.path.isdir(args.out_dir):
+        os.makedirs(args.out_dir)
+
+    # biggest first => no worker is left alone with a big file at the end
+    inputs.sort(key=os.path.getsize, reverse=True)
+    jobs = [(path, output_path(path, args.out_dir), args.batch) for path in inputs]
+
+    start = time.time()
+    pool = multiprocessing.Pool(min(args.processes, len(jobs)))
+    summaries = []
+    for summary in pool.imap_unordered(replay, jobs):
+        summaries.append(summary)
+        print '%-40s %10d transactions %8.2fs' % (summary['input'], summary['transactions'], summary['seconds'])
+        sys.stdout.flush()
+    pool.close()
+    pool.join()
+    elapsed = time.time() - start
+
+    summaries.sort(key=lambda summary: summary['input'])
+    total = sum(summary['transactions'] for summary in summaries)
+    with open(args.summary, 'w') as f:
+        json.dump({
+            'files': len(summaries),
+            'transactions': total,
+            'seconds': elapsed,
+            'transactions_per_sec': total / elapsed if elapsed else 0.0,
+            'processes': min(args.processes, len(jobs)),
+            'replays': summaries,
+        }, f, indent=2, sort_keys=True)
+    print '%d files, %d transactions in %.2fs' % (len(summaries), total, elapsed)
+
+if __name__ == '__main__':
+    main()
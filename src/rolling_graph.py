@@ -0,0 +1,184 @@
+"""
+Rolling graph of Venmo users
+
+The engine behind rolling_median_YJL.py: transactions are fed one at a time,
+and only the transactions in the current sliding window are kept in memory.
+
+For each transaction:
+1. check its validity
+2. check its duplicity
+3. update the graph (if necessary)
+4. update the window (if necessary)
+5. find the new median, only if the degrees have changed (or use the old one)
+
+Only a new edge, or edges kicked out of the window, change the degrees:
+an expired or repetitive transaction (even a refresh that moves the edge to a later second)
+leaves them as they are, so the median is not recomputed (see changed, recomputed, skipped).
+
+At any point, the window can be queried: degree of a user, live neighbors of a user
+(with expiring time of each edge), and the top-K users by degree.
+"""
+from degree_backends import make_degrees
+from graph_store import Graph
+from sliding_window import SlidingWindow
+
+# status of a transaction (see images/status.png)
+EXPIRED = 'expired'                             # this transaction can be ignored
+REPETITIVE_USELESS = 'repetitive but useless'   # older than the existing edge
+REPETITIVE_USEFUL = 'repetitive but useful'     # later than the existing edge => refresh it
+NEW = 'new'                                     # add this edge in graph
+STATUSES = (EXPIRED, REPETITIVE_USELESS, REPETITIVE_USEFUL, NEW)
+
+class RollingGraph(object):
+    """
+    Class of a rolling graph
+
+    span: length of the sliding window (in seconds)
+    endtime: the latest transaction in current window
+    graph: graph of current window (see graph_store.py)
+    window: buckets of edges (packed ids, one bucket per second) in current window
+    degrees: statistics of degrees in graph (backend: see degree_backends.py; alpha: relative error of the sketch)
+    median: median degree of current graph
+    status: status of the latest transaction
+    changed: whether the latest transaction changed the degrees
+    recomputed, skipped: number of transactions after which the median was recomputed, or not
+    """
+    def __init__(self, span=60, alpha=None, backend='auto'):
+        self.span = span
+        self.degrees = make_degrees(backend, alpha)
+        self.graph = Graph(self.degrees)
+        self.window = None
+        self.endtime = None
+        self.median = 0
+        self.status = None
+        self.changed = False
+        self.recomputed = 0
+        self.skipped = 0
+
+    def __repr__(self):
+        return '%d nodes, %d edges, median %.2f' % (len(self.graph), len(self.window or ()), self.median)
+
+    def update(self, transac_time, poi_a, poi_b):
+        """
+        Feed one transaction into the graph
+
+        Return: median degree after this transaction
+        """
+        if self.window is None:                         # the first transaction defines the window
+            self.start(transac_time)
+
+        self.changed = False
+        if not self.validity(transac_time):             # if it's expired ...
+            self.status = EXPIRED
+            self.skipped += 1
+            return self.median                          # ... no need to find new median.
+
+        temp = self.endtime
+        edge = self.graph.edge(poi_a, poi_b)
+        self.status = self.duplicity(transac_time, edge)
+        if self.status is None:
+            self.make_edge(transac_time, edge)
+            self.status = NEW
+
+        # If the endtime has changed => update the window
+        if self.endtime > temp:
+            self.cut_edge()
+
+        if self.changed:                                # only if the degrees have changed
+            self.median = self.find_median()
+            self.recomputed += 1
+        else:
+            self.skipped += 1
+        return self.median
+
+    def start(self, first_time):
+        """
+        Define the window with the time of the first transaction of the stream
+
+        (A replay of part of a stream starts with the first time of the whole stream.)
+        """
+        self.endtime = first_time + self.span
+        self.window = SlidingWindow(first_time)
+
+    def validity(self, transac_time):
+        """
+        Check whether this transaction is invalid or valid
+
+        Return: boolean value
+        """
+        return (self.endtime - self.span <= transac_time)
+
+    def duplicity(self, transac_time, edge):
+        """
+        Check whether this transaction is repetitive (the edge is already in graph)
+
+        If it's later than the existing one, refresh the edge.
+
+        Return: REPETITIVE_USEFUL or REPETITIVE_USELESS (None if it's new)
+        """
+        exp_time = self.graph.expiry(edge)
+        if exp_time is None:
+            return None
+
+        the_other_transac_time = exp_time - self.span
+        if transac_time > the_other_transac_time:       # if later than the earlier one...
+            # ...move the edge from the earlier second to this one
+            self.window.move(edge, the_other_transac_time, transac_time)
+            self.graph.set_expiry(edge, transac_time + self.span)
+            self.endtime = max(transac_time, self.endtime)
+            return REPETITIVE_USEFUL
+        return REPETITIVE_USELESS
+
+    def make_edge(self, transac_time, edge):
+        """
+        Construct a new edge for a valid transaction
+
+        1. put it into the bucket of its second
+        2. initialize two nodes (if necessary) and construct the edge between them
+        """
+        self.window.add(edge, transac_time)
+        self.graph.add_edge(edge, transac_time + self.span)
+        self.endtime = max(transac_time, self.endtime)
+        self.changed = True
+
+    def cut_edge(self):
+        """
+        Cut these edges formed more than 1 window since the latest transaction time.
+
+        In window, pop the buckets of seconds before the start of window.
+        In graph, fix both nodes involving in each expired transaction.
+        """
+        expired = self.window.expire(self.endtime - self.span)
+        for edge in expired:
+            self.graph.cut_edge(edge)                   # remove the edge, and the nodes left alone
+        if expired:
+            self.changed = True
+
+    def find_median(self):
+        return self.degrees.median()
+
+    def statistic(self, name):
+        """
+        Statistic of degrees in current graph: 'median', 'max', 'p90', 'p99', ... (see degree_median.py)
+        """
+        if name == 'median':
+            return self.median
+        return self.degrees.statistic(name)
+
+    def degree(self, name):
+        """
+        Current degree of this user (0 if not in the window)
+        """
+        return self.graph.degree(name)
+
+    def neighbors(self, name):
+        """
+        Live neighbors of this user: list of (neighbor, expiring time of the edge)
+        """
+        return self.graph.neighbors(name)
+
+    def top(self, k=10):
+        """
+        The k users of highest degree in the window: list of (name, degree)
+        """
+        return self.graph.top(k)
@@ -12,282 +12,324 @@ The vertices on the graph represent Venmo users and whenever one user pays anoth
 an edge is formed between the two users.
 
 """
+import os
 import sys
-import datetime
-import numpy
-
-class Node(object):
-    """
-    Class of a Node
-
-    For each node, record its:
-    0. name (person of interest)
-    1. number of connected edges
-    2. counterparts that connected to
-    3. expiring time of each edge
-    4. expiring time of itself
+import argparse
+import socket
+from rolling_graph import RollingGraph
+from trans_parser import parse_line, MalformedLine
+from degree_median import check_statistic
+from degree_backends import BACKENDS
+from multi_window import MultiWindowGraph, window_paths, multi_window_rows, write_rows
+from mmap_reader import INDEX_EVERY, map_file, mmap_lines, parse_time, time_index, time_range, until
+
+OUTPUT_BUFFER = 1 << 20         # bytes of output written at a time
+
+def read_lines(source):
     """
-    def __init__(self, node):
-        self.name = node
-        self.neighbors = {}     # key = name of neighbors, value = expiring time
-        self.num_of_edges = 0   # number of connected edges
-
-    def __repr__(self):
-        return '%s, %d' % (self.name, self.num_of_edges)
-
-def check_format(dct):
-    
-    #check this line has valid format or not
-    
-    validity = False
-    checker_dict = (type(dct) is dict) and (dct != {})
-    checker_time = checker_actor = checker_target = False
-    if checker_dict:
-        try:
-            t = datetime.datetime.strptime(dct['created_time'], '%Y-%m-%dT%H:%M:%SZ')
-            a = dct['actor']
-            b = dct['target']
-        except ValueError:
-            t = a = b = False
-        except KeyError:
-            t = a = b = False
+    Line source: read the input one line at a time
 
-        checker_time = (type(t) is datetime.datetime)
-        checker_actor = (type(a) is str)
-        checker_target = (type(b) is str)
+    source:
+    path of a txt file
+    '-': stdin
+    'tcp://host:port' or 'unix:///path/to/socket': listen there and read from one producer
 
-    return (checker_dict and checker_time and checker_actor and checker_target)
-
-def rolling_med(transactions, output):
+    Return: iterator of lines
     """
-    Input:
-    transactions is a list that contains all records as dictionary, 
-    transactions = ['created_time', 'poi_a', 'poi_b']
-    created_time: How many seconds from transaction time to reference time
-    poi: sorted actor/target pair => therefore, Mary/Andy and Andy/Mary will have the same order.
-    
-    graph: a dictionary to represent graph info, (key = name of node, value = node)
-    window: a queue to record transactions in the rolling window.
-
-    For each transaction:
-    1. check its validity
-    2. check its duplicity
-    3. update the graph (if necessary)
-    4. update the window (if necessary)
-    5. find the new median (or use the old one)
-    """
-
-    def validity(endtime, single_transaction):
-        """
-        Check whether this transaction is invalid or valid
-
-        Return: boolean value
-        """
-        transac_time = single_transaction[0]
-        return (endtime-60 <= transac_time)
-
-    def duplicity(endtime, graph, window, single_transaction, new_median):
-        """
-        Check whether this transaction will make a new_edge or not
-
-        Return: new endtime (if has any)
-        """
-        transac_time = single_transaction[0]
-        poi_a = single_transaction[1]
-        poi_b = single_transaction[2]
-
-        nodes_in_window = [nd.name for nd in graph]
-        index_a = index_b = 0
-
-        if poi_a in nodes_in_window and poi_b in nodes_in_window: 
-            index_a = nodes_in_window.index(poi_a)
-            index_b = nodes_in_window.index(poi_b)
-
-        duplicated = (poi_b in nodes_in_window and poi_a in graph[index_b].neighbors.keys())
-
-        if duplicated:
-
-            new_median = False          # need to find new median only when endtime is updated
-            the_other_transac_time = graph[index_b].neighbors[poi_a]-60
-
-            if transac_time > the_other_transac_time:             # if later than the earlier one...
-
-                for x in window:                                # ...update the window
-                    if x[1] == poi_a and x[2] == poi_b:
-                        assert (x[0] <= single_transaction[0])
-                        window.remove(x)                        # ...remove the earlier one
-                window.append(single_transaction)               # ...and add this new one
-
-                if transac_time > endtime:                      # if even later than endtime...
-                    new_median = True                           # ...need to cut some more edges
-
-            return max(transac_time, endtime)
-
-        return False
-
-    def make_edge(endtime, graph, window, single_transaction, new_median):
-        """
-        Construct a new edge for a valid transaction
-
-        check whether there's a duplicated situation.
-
-        1. initialize two nodes (if necessary)
-        2. construct the edge between two nodes
-        3. calculate the median degree of vertex
-        
-        input -
-        endtime: the latest transaction in current window
-        graph: graph of current window
-        window: transaction queue in current window
-        single_transaction
-        """
-        new_median = True                       # Definitely need to find new median
-
-        transac_time = single_transaction[0]
-        exp_time = transac_time + 60
-        poi_a = single_transaction[1]
-        poi_b = single_transaction[2]
-        
-        index_a = index_b = 0
-
-        nodes_in_window = [nd.name for nd in graph]
-
-        # initialize the node if necessary
-        if poi_a not in nodes_in_window:
-            graph.append(Node(poi_a))
-            nodes_in_window.append(poi_a)       # need to update name list
-        if poi_b not in nodes_in_window:
-            graph.append(Node(poi_b))
-            nodes_in_window.append(poi_b)       # need to update name list
-
-        index_a = nodes_in_window.index(poi_a)
-        index_b = nodes_in_window.index(poi_b)
-
-        # insert i at the correct index
-        if window:
-            index = len(window)
-            while transac_time < window[index-1][0] and index >= 0:
-                index -= 1
-            window.insert(index,single_transaction)
-        else:
-            window.append(single_transaction)
+    if source == '-':
+        stream = sys.stdin
+    elif source.startswith('tcp://') or source.startswith('unix://'):
+        stream = listen(source)
+    else:
+        return open(source, 'r')
 
-        # construct the edge (update the info in each node)
-        graph[index_a].neighbors[poi_b] = exp_time
-        graph[index_a].num_of_edges += 1
-        graph[index_b].neighbors[poi_a] = exp_time
-        graph[index_b].num_of_edges += 1
+    # no read-ahead => each line is handed out as soon as it arrives
+    return iter(stream.readline, '')
 
-        return max(transac_time, endtime)
-
-    def cut_edge(endtime, graph, sorted_window, new_median):
-        """
-        Cut these edges formed more than 1 min since the latest transaction time.
-
-        In graph, fix both nodes involving in the expired transaction.
-        Check transactions one by one in window from oldest, and stop when still un-expire.
-        
-        In window, remove expired transactions (by del)
-        """
-        starttime = endtime - 60
-        cut = 0                                         # The index of transaction in window
-
-        # In graph
-        while sorted_window[cut][0] < starttime:        # for each transaction ...
-
-            new_median = True 
-
-            poi_a = sorted_window[cut][1]               # get name of both nodes that involving in,
-            poi_b = sorted_window[cut][2]
-
-            nodes_in_window = [nd.name for nd in graph] # from all we have in graph,
-            index_a = nodes_in_window.index(poi_a)      # get their index.
-            index_b = nodes_in_window.index(poi_b)
-
-            del graph[index_a].neighbors[poi_b]         # (1) remove b from a's neighbor
-            graph[index_a].num_of_edges -= 1            # (2) a's number of connected edge - 1
-            del graph[index_b].neighbors[poi_a]
-            graph[index_b].num_of_edges -= 1
-
-            # If anyone of them is now having no neighbors => DELETE THEM
-            if graph[index_a].num_of_edges == 0 and graph[index_b].num_of_edges == 0:
-                del graph[max(index_a, index_b)]
-                del graph[min(index_a, index_b)]
-            elif graph[index_a].num_of_edges == 0 or graph[index_b].num_of_edges == 0:
-                if graph[index_a].num_of_edges == 0:
-                    del graph[index_a]
-                else:
-                    del graph[index_b]
+def bind(address):
+    """
+    Bind a local TCP/Unix socket: 'tcp://host:port' or 'unix:///path/to/socket'
 
-            cut += 1                                    # Go to next expiring transaction
+    Return: socket (not listening yet)
+    """
+    if address.startswith('unix://'):
+        path = address[len('unix://'):]
+        if os.path.exists(path):
+            os.unlink(path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+    else:
+        host, port = address[len('tcp://'):].rsplit(':', 1)
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((host, int(port)))
+    return server
+
+def listen(address):
+    """
+    Wait for one producer on a local TCP/Unix socket
 
-        # In window
-        sorted_window = [sorted_window[i] for i in xrange(len(sorted_window)) if i >= cut]
-        return sorted_window
+    Return: file object of the connection
+    """
+    server = bind(address)
+    server.listen(1)
+    conn, _ = server.accept()
+    server.close()
+    return conn.makefile('r')
 
+def parse_transactions(lines, report=None):
+    """
+    Parser and validator: turn lines into transactions (see trans_parser.py)
 
-    graph = []              # list of node
-    window = []             # list of transaction
-    endtime = transactions[0][0] + 60
-    median = 0
+    Each transaction will be read as (seconds, poi_a, poi_b)
+    seconds: created_time in seconds since epoch
+    poi: sorted actor/target pair => therefore, Mary/Andy and Andy/Mary will have the same order.
 
-    for i in xrange(len(transactions)):                 # For each transaction ...
-        new_median = True
-        temp = endtime
+    Incorrect lines are reported (to report, default: stdout) and skipped.
+    """
+    for line in lines:
+        try:
+            yield parse_line(line)
+        except MalformedLine as err:
+            print >>report, str(err), line
 
-        if not validity(endtime, transactions[i]):      # if it's expired ...
-            new_median = False                          # ... no need to find new_median.
+def rolling_medians(transactions, engine=None):
+    """
+    Window engine: feed transactions into a rolling graph one at a time
 
-        else:                                           # if it's not expired ...
-            repeat = duplicity(endtime, graph, window, transactions[i], new_median)
+    Return: iterator of medians (one per transaction)
+    """
+    if engine is None:
+        engine = RollingGraph()
+    for transac_time, poi_a, poi_b in transactions:
+        yield engine.update(transac_time, poi_a, poi_b)
 
-            # The endtime of window could need renew, no matter it's repeated or not.
-            if repeat:
-                endtime = repeat
-            else:
-                endtime = make_edge(endtime, graph, window, transactions[i], new_median)
+def write_medians(medians, output, flush=False):
+    """
+    Median writer: one median per line (flush => as soon as it's found)
 
-            # If the endtime has changed => update the window
-            if endtime > temp:
-                # Here the window is sorted already
-                window = cut_edge(endtime, graph, window, new_median)
+    The median seldom changes => the line of the last one is formatted only once.
+    """
+    last = line = None
+    for median in medians:
+        if median != last:
+            last = median
+            line = "%.2f\n" % (median)
+        output.write(line)
+        if flush:
+            output.flush()
 
-            # If the graph has changed => find new median
-            if new_median:
-                median = numpy.median([nd.num_of_edges for nd in graph])
-            
-        output.write("%.2f\n" % (median))
+def rolling_med(transactions, output):
+    """
+    Input:
+    transactions is an iterable of records,
+    transactions = ('created_time', 'poi_a', 'poi_b')
+    created_time: seconds (e.g. since epoch, or since the first transaction)
+    poi: sorted actor/target pair => therefore, Mary/Andy and Andy/Mary will have the same order.
 
-    return
+    Output: the median degree after each transaction (see rolling_graph.py)
+    """
+    write_medians(rolling_medians(transactions), output)
 
 ############################################################
 if __name__ == '__main__':
-    INPUT = open(sys.argv[1], 'r')      # txt file that containing transaction records
-    OUTPUT = open(sys.argv[2], 'w')
-    TRANS_REC = []                      # transaction records
+    # line source -> parser -> validator -> window engine -> median writer
+    PARSER = argparse.ArgumentParser(description='Rolling median degree of Venmo users')
+    PARSER.add_argument('input', help="txt file, '-' (stdin), tcp://host:port or unix:///path")
+    PARSER.add_argument('output', help="txt file or '-' (stdout)")
+    PARSER.add_argument('--batch', action='store_true',
+                        help='read the input in large chunks and convert them with numpy (backfills)')
+    PARSER.add_argument('--pipelined', action='store_true',
+                        help='parse in a separate process, overlapped with the window engine')
+    PARSER.add_argument('--stats', metavar='FILE',
+                        help='time each stage, count each status of transaction, and dump them into FILE')
+    PARSER.add_argument('--stats-every', type=int, default=10000, metavar='N',
+                        help='dump the stats every N transactions (and at the end)')
+    PARSER.add_argument('--stats-format', choices=('text', 'prometheus'), default='text')
+    PARSER.add_argument('--windows', default='60', metavar='SECONDS',
+                        help='lengths of windows, e.g. 60,300,3600 (output.txt => output.60s.txt, ...)')
+    PARSER.add_argument('--statistics', default='median', metavar='NAMES',
+                        help='statistics of degrees in each window, e.g. median,p90,p99,max')
+    PARSER.add_argument('--approximate', type=float, metavar='ALPHA',
+                        help='approximate statistics within relative error ALPHA, e.g. 0.01 (see degree_sketch.py)')
+    PARSER.add_argument('--backend', choices=BACKENDS, default='auto',
+                        help='statistics of degrees: incremental histogram, sketch (with --approximate),'
+                             ' or recomputed with introselect/numpy (see degree_backends.py)')
+    PARSER.add_argument('--output-format', choices=('text', 'f32', 'rle'), default='text',
+                        help='text, float32 per transaction, or run-length records (see median_codec.py)')
+    PARSER.add_argument('--time-index', metavar='FILE',
+                        help='also write the change points of the median into FILE,'
+                             ' to query the median at any time (see median_index.py)')
+    PARSER.add_argument('--lateness', type=int, metavar='SECONDS',
+                        help='reorder the transactions by created_time, allowing this much lateness'
+                             ' (later ones are dropped and counted)')
+    PARSER.add_argument('--checkpoint', metavar='FILE',
+                        help='snapshot the window into FILE periodically, on SIGUSR1 and at the end')
+    PARSER.add_argument('--checkpoint-every', type=int, default=100000, metavar='N',
+                        help='snapshot every N transactions')
+    PARSER.add_argument('--resume', action='store_true',
+                        help='restore the --checkpoint snapshot (if any) and continue from its offsets')
+    PARSER.add_argument('--mmap', action='store_true',
+                        help='map the input file into memory instead of reading it through text I/O')
+    PARSER.add_argument('--since', type=parse_time, metavar='TIME',
+                        help='only the lines from this created_time (or seconds) on, found with the index')
+    PARSER.add_argument('--until', type=parse_time, metavar='TIME',
+                        help='stop at the first transaction later than this created_time (or seconds)')
+    PARSER.add_argument('--warmup', type=int, metavar='SECONDS',
+                        help='with --since, warm the window up with the lines of these seconds before it'
+                             ' (default: the longest window)')
+    PARSER.add_argument('--partitions', type=int, metavar='N',
+                        help='cut the input file into N time ranges, replay them in parallel (each warmed up'
+                             ' with --warmup seconds, default: 2 windows), and stitch the outputs')
+    PARSER.add_argument('--processes', type=int, metavar='N',
+                        help='worker processes for --partitions (default: one per CPU)')
+    PARSER.add_argument('--index-every', type=int, default=INDEX_EVERY, metavar='N',
+                        help='lines between two entries of the index (input.txt => input.txt.idx)')
+    ARGS = PARSER.parse_args()
+
+    SPANS = [int(span) for span in ARGS.windows.split(',')]
+    STATISTICS = ARGS.statistics.split(',')
+    try:
+        for NAME in STATISTICS:
+            check_statistic(NAME)
+    except ValueError as err:
+        PARSER.error(str(err))
+    MULTI = (SPANS != [60] or STATISTICS != ['median'])  # several windows/statistics in one pass
+    if ARGS.output == '-' and len(SPANS) > 1:
+        PARSER.error('several windows need an output file (one per window)')
+    if ARGS.batch and ARGS.pipelined:
+        PARSER.error('--batch and --pipelined are two different ingest paths')
+    if ARGS.checkpoint and (ARGS.batch or ARGS.pipelined or MULTI):
+        PARSER.error('--checkpoint works with one window and the default ingest path')
+    if ARGS.output_format != 'text' and (MULTI or ARGS.checkpoint):
+        PARSER.error('--output-format %s works with one window, without --checkpoint' % ARGS.output_format)
+    if ARGS.lateness is not None and ARGS.checkpoint:
+        PARSER.error('--checkpoint does not keep the transactions held by --lateness')
+    if ARGS.approximate is not None and (ARGS.checkpoint or ARGS.partitions):
+        PARSER.error('--approximate works without --checkpoint and --partitions')
+    if ARGS.approximate is not None and ARGS.backend not in ('auto', 'sketch'):
+        PARSER.error('--approximate is the relative error of --backend sketch')
+    if ARGS.backend not in ('auto', 'histogram') and (ARGS.checkpoint or ARGS.partitions):
+        PARSER.error('--checkpoint and --partitions work with the histogram backend')
+    if ARGS.time_index and (MULTI or ARGS.checkpoint or ARGS.partitions):
+        PARSER.error('--time-index works with one window, without --checkpoint and --partitions')
+    if ARGS.resume and not ARGS.checkpoint:
+        PARSER.error('--resume needs --checkpoint')
+    if ARGS.since is not None:
+        ARGS.mmap = True
+        if ARGS.resume:
+            PARSER.error('--since and --resume are two different starting points')
+    if ARGS.partitions and (MULTI or ARGS.batch or ARGS.pipelined or ARGS.checkpoint or ARGS.mmap
+                            or ARGS.lateness is not None or ARGS.output_format != 'text'
+                            or not os.path.isfile(ARGS.input)):
+        PARSER.error('--partitions works with an input file, one window and the default options')
+    if ARGS.mmap and (ARGS.batch or ARGS.pipelined or not os.path.isfile(ARGS.input)):
+        PARSER.error('--mmap/--since need an input file and the default ingest path')
+
+    RESUME = ARGS.resume and os.path.exists(ARGS.checkpoint)
+    if RESUME:
+        from checkpoint import load
+        if not os.path.isfile(ARGS.input):
+            PARSER.error('--resume needs an input file')
+        ENGINE, INPUT_OFFSET, OUTPUT_OFFSET = load(ARGS.checkpoint)
+        if INPUT_OFFSET > os.path.getsize(ARGS.input):
+            PARSER.error('%s is shorter than its checkpoint' % ARGS.input)
+    else:
+        ENGINE, INPUT_OFFSET, OUTPUT_OFFSET = None, 0, 0
+
+    if ARGS.output == '-':
+        OUTPUTS = [sys.stdout]
+    elif RESUME and OUTPUT_OFFSET:
+        OUTPUTS = [open(ARGS.output, 'r+', OUTPUT_BUFFER)]  # drop what was written after the checkpoint
+        OUTPUTS[0].truncate(OUTPUT_OFFSET)
+        OUTPUTS[0].seek(OUTPUT_OFFSET)
+    else:
+        OUTPUTS = [open(path, 'wb' if ARGS.output_format != 'text' else 'w', OUTPUT_BUFFER)
+                   for path in window_paths(ARGS.output, SPANS)]
+    REPORT = sys.stderr if OUTPUTS[0] is sys.stdout else sys.stdout
+    STREAMING = not os.path.isfile(ARGS.input)  # stdin/socket => emit each median right away
+
+    if ARGS.partitions:
+        from partitioned import partitioned_replay
+        partitioned_replay(ARGS.input, OUTPUTS[0], REPORT, ARGS.partitions, ARGS.processes,
+                           SPANS[0], ARGS.warmup, ARGS.index_every)
+        OUTPUTS[0].close()
+        sys.exit(0)
+
+    if ARGS.batch:
+        from batch_ingest import read_chunks, batch_transactions    # numpy is only needed here
+        INPUT = sys.stdin if ARGS.input == '-' else open(ARGS.input, 'r')
+        TRANSACTIONS = batch_transactions(read_chunks(INPUT), REPORT)
+        STREAMING = False
+    elif ARGS.pipelined:
+        from pipelined import pipelined_transactions
+        TRANSACTIONS = pipelined_transactions(ARGS.input, REPORT)
+    else:
+        START = INPUT_OFFSET                    # byte offset of the first line to replay
+        if ARGS.mmap:
+            BUFFER = map_file(ARGS.input)
+            if ARGS.since is not None:          # jump to the time range with the index
+                WARMUP = max(SPANS) if ARGS.warmup is None else ARGS.warmup
+                INDEX = time_index(ARGS.input, BUFFER, ARGS.index_every)
+                WARM_FROM, START = time_range(BUFFER, INDEX, ARGS.since, WARMUP)
+                WARM_LINES = mmap_lines(BUFFER, WARM_FROM, START)
+            LINES = mmap_lines(BUFFER, START)
+        else:
+            LINES = read_lines(ARGS.input)
+            if START:
+                LINES.seek(START)
+        if ARGS.checkpoint:
+            from checkpoint import LineOffset, checkpointed
+            LINES = LineOffset(LINES, START)    # --since => from the start of its time range
+        TRANSACTIONS = parse_transactions(LINES, REPORT)
+
+    if MULTI:
+        MULTI_ENGINE = MultiWindowGraph(SPANS, STATISTICS, ARGS.approximate, ARGS.backend)
+        ENGINE = MULTI_ENGINE.engines[0]        # --stats: the first window
+    elif ENGINE is None:
+        ENGINE = RollingGraph(alpha=ARGS.approximate, backend=ARGS.backend)
+
+    if ARGS.since is not None:                  # no output for the lines before --since
+        WARM_ENGINE = MULTI_ENGINE if MULTI else ENGINE
+        for TRANSACTION in parse_transactions(WARM_LINES, open(os.devnull, 'w')):
+            WARM_ENGINE.update(*TRANSACTION)
+    if ARGS.until is not None:
+        TRANSACTIONS = until(TRANSACTIONS, ARGS.until)
+    if ARGS.lateness is not None:
+        from reorder import ReorderBuffer, reordered
+        REORDER = ReorderBuffer(ARGS.lateness)
+        TRANSACTIONS = reordered(TRANSACTIONS, REORDER)
+
+    if ARGS.stats:
+        from instrument import Stats, instrument
+        STATS = Stats()
+        if ARGS.lateness is not None:
+            STATS.reorder = REORDER
+        TRANSACTIONS = STATS.timed_iter('parse', TRANSACTIONS)
+        instrument(ENGINE, STATS, ARGS.stats, ARGS.stats_every, ARGS.stats_format)
+
+    if MULTI:
+        write_rows(multi_window_rows(TRANSACTIONS, MULTI_ENGINE), OUTPUTS, STREAMING)
+    elif ARGS.checkpoint:
+        MEDIANS = rolling_medians(TRANSACTIONS, ENGINE)
+        MEDIANS = checkpointed(MEDIANS, ENGINE, LINES, OUTPUTS[0], ARGS.checkpoint, ARGS.checkpoint_every)
+        write_medians(MEDIANS, OUTPUTS[0], STREAMING)
+    else:
+        if ARGS.time_index:
+            from median_index import time_indexed
+            MEDIANS = time_indexed(TRANSACTIONS, ENGINE, ARGS.time_index)
+        else:
+            MEDIANS = rolling_medians(TRANSACTIONS, ENGINE)
+        if ARGS.output_format != 'text':
+            from median_codec import WRITERS
+            WRITERS[ARGS.output_format](MEDIANS, OUTPUTS[0], STREAMING)
+        else:
+            write_medians(MEDIANS, OUTPUTS[0], STREAMING)
 
-    ref_time = 0
+    if ARGS.stats:
+        STATS.dump(ARGS.stats, ARGS.stats_format)
+    if ARGS.lateness is not None and REORDER.dropped:
+        print >>sys.stderr, '%d transactions later than %ds were dropped' % (REORDER.dropped, ARGS.lateness)
 
-    for line in INPUT:                  # Read them all
-        newdict = {}
-        try:
-            newdict = eval(line)        # Since it's already in dictionary format, just read as dic
-            if check_format(newdict):
-                if not TRANS_REC:
-                    ref_time = datetime.datetime.strptime(newdict['created_time'], '%Y-%m-%dT%H:%M:%SZ')
-                    TRANS_REC.append(sorted([0, newdict['actor'], newdict['target']]))
-                else:
-                    trans_time = datetime.datetime.strptime(newdict['created_time'], '%Y-%m-%dT%H:%M:%SZ')
-                    newdict['created_time'] = (trans_time - ref_time).total_seconds()
-                    TRANS_REC.append(sorted(newdict.values()))
-            else:
-                print "incorrect time/poi :", line
-        except SyntaxError:
-            print "incorrect line format: (SyntaxError)", line
-        except NameError:
-            print "incorrect line format: (NameError)", line
-
-    rolling_med(TRANS_REC, OUTPUT)
-
-    INPUT.close()
-    OUTPUT.close()
\ No newline at end of file
+    for OUTPUT in OUTPUTS:
+        OUTPUT.close()
@@ -0,0 +1,74 @@
+"""
+Sliding window of transactions
+
+Transactions are kept in buckets, one bucket per second (key = second, value = set of edges).
+So there's no need to keep the window sorted:
+
+1. add an edge: put it into the bucket of its second - O(1)
+2. refresh an edge (repetitive but useful): move it to the bucket of the new second - O(1)
+3. kick out expired edges: pop the buckets older than the start of the window,
+   one second at a time, and the window is never copied.
+"""
+
+class SlidingWindow(object):
+    """
+    Class of a sliding window
+
+    start: the oldest second that is still in the window
+    buckets: key = second, value = set of edges (packed pair of ids, see graph_store.py) formed in that second
+    """
+    def __init__(self, starttime):
+        self.start = int(starttime)
+        self.buckets = {}
+        self.size = 0           # number of edges in window
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return '%d edges since %d' % (self.size, self.start)
+
+    def add(self, edge, transac_time):
+        """
+        Put a new edge into the bucket of its second
+        """
+        second = int(transac_time)
+        bucket = self.buckets.get(second)
+        if bucket is None:
+            bucket = self.buckets[second] = set()
+        bucket.add(edge)
+        self.size += 1
+
+    def move(self, edge, old_time, new_time):
+        """
+        Refresh an edge: from the bucket of old_time to the bucket of new_time
+        """
+        second = int(old_time)
+        bucket = self.buckets[second]
+        bucket.remove(edge)
+        if not bucket:
+            del self.buckets[second]
+        self.size -= 1
+        self.add(edge, new_time)
+
+    def expire(self, starttime):
+        """
+        Kick out the edges formed before starttime
+
+        Return: list of expired edges
+        """
+        starttime = int(starttime)
+        buckets = self.buckets
+        if starttime - self.start > len(buckets):       # long jump => only visit seconds in use
+            seconds = sorted(s for s in buckets if s < starttime)
+        else:
+            seconds = xrange(self.start, starttime)
+
+        expired = []
+        for second in seconds:
+            bucket = buckets.pop(second, None)
+            if bucket:
+                expired.extend(bucket)
+        self.size -= len(expired)
+        self.start = max(self.start, starttime)
+        return expired
@@ -0,0 +1,138 @@
+"""
+Parser of transaction lines
+
+Each line is a JSON dictionary, e.g.
+{"created_time": "2016-03-28T23:23:12Z", "target": "Raffi-Antilian", "actor": "Amber-Sauer"}
+
+1. decode it with json (or ujson, if installed) instead of eval
+2. convert created_time into seconds since epoch:
+   the fixed layout 'YYYY-MM-DDTHH:MM:SSZ' is sliced into integers (no strptime),
+   and each distinct second is only converted once (cache).
+
+Incorrect lines raise MalformedLine, with the same classification as before:
+'incorrect line format: (SyntaxError)', 'incorrect line format: (NameError)' or 'incorrect time/poi :'
+"""
+import ast
+import datetime
+
+try:
+    import ujson as json        # faster decoder (optional)
+except ImportError:
+    import json
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+EPOCH = datetime.datetime(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+CACHE_SIZE = 4096               # number of distinct seconds to remember
+
+class MalformedLine(ValueError):
+    """
+    Class of an incorrect line
+
+    str(error): how this line is reported
+    """
+    pass
+
+SYNTAX_ERROR = 'incorrect line format: (SyntaxError)'
+NAME_ERROR = 'incorrect line format: (NameError)'
+TIME_POI_ERROR = 'incorrect time/poi :'
+
+_seconds_cache = {}             # key = created_time, value = seconds since epoch
+
+def epoch_seconds(created_time):
+    """
+    Convert created_time into seconds since epoch
+
+    Return: None if it's not a valid time
+    """
+    if not isinstance(created_time, basestring):
+        return None
+    seconds = _seconds_cache.get(created_time)
+    if seconds is not None:
+        return seconds
+
+    seconds = _fixed_layout(created_time)
+    if seconds is None:                         # not the usual layout => let strptime decide
+        try:
+            t = datetime.datetime.strptime(created_time, TIME_FORMAT)
+        except (ValueError, TypeError):
+            return None
+        seconds = int((t - EPOCH).total_seconds())
+
+    if len(_seconds_cache) >= CACHE_SIZE:
+        _seconds_cache.clear()
+    _seconds_cache[created_time] = seconds
+    return seconds
+
+def _fixed_layout(s):
+    """
+    Fast path for 'YYYY-MM-DDTHH:MM:SSZ'
+
+    Return: seconds since epoch (None if s is not in this exact layout)
+    """
+    if not (len(s) == 20 and s[4] == '-' and s[7] == '-' and s[10] == 'T'
+            and s[13] == ':' and s[16] == ':' and s[19] == 'Z'):
+        return None
+    digits = s[0:4] + s[5:7] + s[8:10] + s[11:13] + s[14:16] + s[17:19]
+    if not digits.isdigit():
+        return None
+    hour = int(s[11:13])
+    minute = int(s[14:16])
+    second = int(s[17:19])
+    if hour > 23 or minute > 59 or second > 59:
+        return None
+    try:
+        day = datetime.date(int(s[0:4]), int(s[5:7]), int(s[8:10])).toordinal()
+    except ValueError:
+        return None
+    return (day - EPOCH_ORDINAL) * 86400 + hour * 3600 + minute * 60 + second
+
+def decode(line):
+    """
+    Decode a line into a dictionary (or whatever it is)
+
+    Only if it's not JSON, fall back on python literals (safe, never evaluated),
+    to tell a SyntaxError from a NameError.
+    """
+    try:
+        return json.loads(line)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(line.strip())
+    except ValueError:                          # a name (or call) instead of a literal
+        raise MalformedLine(NAME_ERROR)
+    except Exception:                           # SyntaxError (or anything eval would choke on)
+        raise MalformedLine(SYNTAX_ERROR)
+
+def to_transaction(dct):
+    """
+    Check this dictionary has valid format or not
+
+    Return: transaction (seconds, poi_a, poi_b) with sorted poi, or None
+    """
+    if type(dct) is not dict or not dct:
+        return None
+    try:
+        seconds = epoch_seconds(dct['created_time'])
+        poi_a = dct['actor']
+        poi_b = dct['target']
+    except KeyError:
+        return None
+    if seconds is None or not isinstance(poi_a, basestring) or not isinstance(poi_b, basestring):
+        return None
+    if poi_b < poi_a:
+        poi_a, poi_b = poi_b, poi_a
+    return (seconds, poi_a, poi_b)
+
+def parse_line(line):
+    """
+    Parse one line
+
+    Return: transaction (seconds, poi_a, poi_b)
+    Raise: MalformedLine
+    """
+    transaction = to_transaction(decode(line))
+    if transaction is None:
+        raise MalformedLine(TIME_POI_ERROR)
+    return transaction
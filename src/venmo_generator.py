@@ -0,0 +1,107 @@
+"""
+Synthetic Venmo transactions (for benchmarks and tests)
+
+Lines look like venmo_input/venmo-trans.txt:
+{"created_time": "2016-03-28T23:23:12Z", "target": "User-12", "actor": "User-3"}
+
+users: size of user population
+alpha: power-law exponent of payer popularity (actor i is picked with weight 1/i^alpha)
+rate: transactions per second
+late: fraction of transactions that arrive late (created up to max_lateness seconds ago)
+duplicates: fraction of transactions that repeat a recent pair (in any order)
+malformed: fraction of incorrect lines
+
+Usage:
+python src/venmo_generator.py --events 100000 --users 10000 --late 0.05 > venmo-trans.txt
+"""
+import sys
+import time
+import bisect
+import random
+import argparse
+
+START = 1459207392              # 2016-03-28T23:23:12Z
+RECENT = 1000                   # number of recent pairs that duplicates are drawn from
+
+MALFORMED = [
+    '{"created_time": "%s", "target": , "actor": "%s"}',
+    '{"created_time": "%s", "actor": "%s"}',
+    '{"created_time": "%s-not-a-time", "target": "x", "actor": "%s"}',
+    'KK %s %s',
+]
+
+def generate(events, users=1000, alpha=1.2, rate=30.0, late=0.02, max_lateness=90,
+             duplicates=0.1, malformed=0.0, seed=0, start=START):
+    """
+    Return: iterator of lines (with '\\n')
+    """
+    rnd = random.Random(seed)
+    names = ['User-%d' % i for i in xrange(users)]
+    cumulative = []                             # cumulative weights of payers
+    total = 0.0
+    for i in xrange(users):
+        total += 1.0 / (i + 1) ** alpha
+        cumulative.append(total)
+
+    recent = []                                 # ring of recent pairs
+    clock = float(start)
+    stamps = {}                                 # key = second, value = created_time
+
+    for i in xrange(events):
+        clock += rnd.expovariate(rate)
+        second = int(clock)
+        if late and rnd.random() < late:
+            second -= rnd.randint(1, max_lateness)
+
+        stamp = stamps.get(second)
+        if stamp is None:
+            if len(stamps) > 4 * max_lateness:
+                stamps.clear()
+            stamp = stamps[second] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(second))
+
+        if recent and duplicates and rnd.random() < duplicates:
+            actor, target = recent[rnd.randrange(len(recent))]
+            if rnd.random() < 0.5:
+                actor, target = target, actor
+        else:
+            actor = names[min(bisect.bisect(cumulative, rnd.random() * total), users - 1)]
+            target = names[rnd.randrange(users)]
+            while target == actor and users > 1:
+                target = names[rnd.randrange(users)]
+            if len(recent) < RECENT:
+                recent.append((actor, target))
+            else:
+                recent[i % RECENT] = (actor, target)
+
+        if malformed and rnd.random() < malformed:
+            yield MALFORMED[rnd.randrange(len(MALFORMED))] % (stamp, actor) + '\n'
+        else:
+            yield '{"created_time": "%s", "target": "%s", "actor": "%s"}\n' % (stamp, target, actor)
+
+def add_arguments(parser):
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--alpha', type=float, default=1.2, help='power-law exponent of payers')
+    parser.add_argument('--rate', type=float, default=30.0, help='transactions per second')
+    parser.add_argument('--late', type=float, default=0.02, help='fraction of late transactions')
+    parser.add_argument('--max-lateness', type=int, default=90)
+    parser.add_argument('--duplicates', type=float, default=0.1, help='fraction of repeated pairs')
+    parser.add_argument('--malformed', type=float, default=0.0, help='fraction of incorrect lines')
+    parser.add_argument('--seed', type=int, default=0)
+
+def options(args):
+    """
+    Return: keyword arguments of generate() from parsed arguments
+    """
+    return dict(users=args.users, alpha=args.alpha, rate=args.rate, late=args.late,
+                max_lateness=args.max_lateness, duplicates=args.duplicates,
+                malformed=args.malformed, seed=args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetic Venmo transactions')
+    parser.add_argument('--events', type=int, default=10000)
+    add_arguments(parser)
+    args = parser.parse_args()
+    sys.stdout.writelines(generate(args.events, **options(args)))
+
+if __name__ == '__main__':
+    main()